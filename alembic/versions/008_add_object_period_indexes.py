@@ -0,0 +1,40 @@
+"""Add indexes on object start and completion dates
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-11-05
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _ensure_index(inspector, table_name: str, index_name: str, columns: list[str]) -> None:
+    existing = {idx['name'] for idx in inspector.get_indexes(table_name)} if inspector.has_table(table_name) else set()
+    if index_name not in existing:
+        op.create_index(index_name, table_name, columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    # Таблица objects создается через create_all при первом запуске бота
+    if not inspector.has_table('objects'):
+        return
+
+    _ensure_index(inspector, 'objects', 'ix_objects_start_date', ['start_date'])
+    _ensure_index(inspector, 'objects', 'ix_objects_completed_at', ['completed_at'])
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_objects_completed_at")
+    op.execute("DROP INDEX IF EXISTS ix_objects_start_date")
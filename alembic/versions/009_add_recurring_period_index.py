@@ -0,0 +1,47 @@
+"""Add composite index on recurring expense start period
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-11-06
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _ensure_index(inspector, table_name: str, index_name: str, columns: list[str]) -> None:
+    existing = {idx['name'] for idx in inspector.get_indexes(table_name)} if inspector.has_table(table_name) else set()
+    if index_name not in existing:
+        op.create_index(index_name, table_name, columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if not inspector.has_table('company_recurring_expenses'):
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('company_recurring_expenses')}
+    # В старой схеме колонки назывались period_year/period_month
+    if not {'start_year', 'start_month'} <= columns:
+        return
+
+    _ensure_index(
+        inspector,
+        'company_recurring_expenses',
+        'ix_company_recurring_expenses_start_period',
+        ['start_year', 'start_month'],
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_company_recurring_expenses_start_period")
@@ -0,0 +1,56 @@
+"""Add composite indexes for filtered and ordered list queries
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-11-06
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('expenses', 'ix_expenses_object_type_date', ['object_id', 'type', sa.text('"date" DESC')]),
+    (
+        'expenses',
+        'ix_expenses_pending_compensation',
+        ['object_id', 'payment_source', 'compensation_status', sa.text('"date" DESC')],
+    ),
+    ('advances', 'ix_advances_object_date', ['object_id', sa.text('"date" DESC')]),
+    ('object_logs', 'ix_object_logs_object_created', ['object_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    (
+        'company_expense_logs',
+        'ix_company_expense_logs_type_entity_created',
+        ['expense_type', 'entity_id', sa.text('created_at DESC')],
+    ),
+]
+
+
+def _ensure_index(inspector, table_name: str, index_name: str, columns: list) -> None:
+    existing = {idx['name'] for idx in inspector.get_indexes(table_name)} if inspector.has_table(table_name) else set()
+    if index_name not in existing:
+        op.create_index(index_name, table_name, columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name, index_name, columns in INDEXES:
+        # Таблицы создаются через create_all при первом запуске бота
+        if inspector.has_table(table_name):
+            _ensure_index(inspector, table_name, index_name, columns)
+
+
+def downgrade() -> None:
+    for _, index_name, _ in reversed(INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
@@ -0,0 +1,58 @@
+"""Delete object children via ON DELETE CASCADE
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-11-07
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CHILD_TABLES = ['expenses', 'advances', 'files', 'object_logs']
+
+
+def _object_fk(inspector, table_name: str):
+    for fk in inspector.get_foreign_keys(table_name):
+        if fk['referred_table'] == 'objects' and fk['constrained_columns'] == ['object_id']:
+            return fk
+    return None
+
+
+def _recreate_object_fk(inspector, table_name: str, ondelete) -> None:
+    fk = _object_fk(inspector, table_name)
+    if fk is None:
+        return
+    if (fk.get('options') or {}).get('ondelete') == ondelete:
+        return
+
+    name = fk['name'] or f'{table_name}_object_id_fkey'
+    op.drop_constraint(name, table_name, type_='foreignkey')
+    op.create_foreign_key(name, table_name, 'objects', ['object_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name in CHILD_TABLES:
+        # Таблицы создаются через create_all при первом запуске бота
+        if inspector.has_table(table_name):
+            _recreate_object_fk(inspector, table_name, 'CASCADE')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name in reversed(CHILD_TABLES):
+        if inspector.has_table(table_name):
+            _recreate_object_fk(inspector, table_name, None)
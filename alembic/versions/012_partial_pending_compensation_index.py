@@ -0,0 +1,54 @@
+"""Replace the pending compensation index with a partial one
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-11-07
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING_WHERE = sa.text("payment_source = 'personal' AND compensation_status = 'pending'")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    # Таблица expenses создается через create_all при первом запуске бота
+    if not inspector.has_table('expenses'):
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_expenses_pending_compensation")
+
+    existing = {idx['name'] for idx in inspector.get_indexes('expenses')}
+    if 'ix_expenses_pending_compensation_partial' not in existing:
+        op.create_index(
+            'ix_expenses_pending_compensation_partial',
+            'expenses',
+            ['object_id', sa.text('"date" DESC')],
+            postgresql_where=PENDING_WHERE,
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_expenses_pending_compensation_partial")
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if inspector.has_table('expenses'):
+        op.create_index(
+            'ix_expenses_pending_compensation',
+            'expenses',
+            ['object_id', 'payment_source', 'compensation_status', sa.text('"date" DESC')],
+        )
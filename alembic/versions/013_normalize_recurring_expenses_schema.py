@@ -0,0 +1,56 @@
+"""Normalize legacy company_recurring_expenses columns
+
+Раньше схема исправлялась во время запросов (crud._ensure_company_recurring_schema).
+Миграция делает то же один раз для баз, где колонки остались в старом виде.
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-11-07
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = 'company_recurring_expenses'
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    # Таблица создается через create_all при первом запуске бота
+    if not inspector.has_table(TABLE):
+        return
+
+    columns = {col['name'] for col in inspector.get_columns(TABLE)}
+
+    if 'period_month' in columns and 'start_month' not in columns:
+        op.alter_column(TABLE, 'period_month', new_column_name='start_month')
+    if 'period_year' in columns and 'start_year' not in columns:
+        op.alter_column(TABLE, 'period_year', new_column_name='start_year')
+
+    if 'day_of_month' not in columns:
+        op.add_column(TABLE, sa.Column('day_of_month', sa.Integer(), nullable=False, server_default='1'))
+        op.alter_column(TABLE, 'day_of_month', server_default=None)
+    if 'end_month' not in columns:
+        op.add_column(TABLE, sa.Column('end_month', sa.Integer(), nullable=True))
+    if 'end_year' not in columns:
+        op.add_column(TABLE, sa.Column('end_year', sa.Integer(), nullable=True))
+    if 'is_active' not in columns:
+        op.add_column(TABLE, sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+        op.alter_column(TABLE, 'is_active', server_default=None)
+
+
+def downgrade() -> None:
+    # Старая схема больше не поддерживается кодом
+    pass
@@ -0,0 +1,46 @@
+"""Add composite indexes for unfiltered expense lists and company expenses by category
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-11-08
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('expenses', 'ix_expenses_object_date', ['object_id', sa.text('"date" DESC')]),
+    (
+        'company_expenses',
+        'ix_company_expenses_category_date',
+        ['category', sa.text('"date" DESC'), sa.text('id DESC')],
+    ),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name, index_name, columns in INDEXES:
+        # Таблицы создаются через create_all при первом запуске бота
+        if not inspector.has_table(table_name):
+            continue
+        existing = {idx['name'] for idx in inspector.get_indexes(table_name)}
+        if index_name not in existing:
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade() -> None:
+    for _, index_name, _ in reversed(INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
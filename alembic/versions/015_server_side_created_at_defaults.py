@@ -0,0 +1,52 @@
+"""Move created_at/uploaded_at defaults to the server
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-11-08
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '015'
+down_revision: Union[str, None] = '014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ('users', 'created_at'),
+    ('objects', 'created_at'),
+    ('expenses', 'created_at'),
+    ('advances', 'created_at'),
+    ('files', 'uploaded_at'),
+    ('company_expenses', 'created_at'),
+    ('company_recurring_expenses', 'created_at'),
+    ('company_expense_logs', 'created_at'),
+    ('object_logs', 'created_at'),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name, column_name in COLUMNS:
+        # Таблицы создаются через create_all при первом запуске бота
+        if inspector.has_table(table_name):
+            op.execute(
+                f"ALTER TABLE {table_name} ALTER COLUMN {column_name} "
+                f"SET DEFAULT timezone('utc', now())"
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name, column_name in reversed(COLUMNS):
+        if inspector.has_table(table_name):
+            op.execute(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} DROP DEFAULT")
@@ -0,0 +1,53 @@
+"""Store objectstatus enum values in lowercase like the other enums
+
+Revision ID: 016
+Revises: 015
+Create Date: 2025-11-08
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '016'
+down_revision: Union[str, None] = '015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    # Таблица objects создается через create_all при первом запуске бота
+    if not inspector.has_table('objects'):
+        return
+
+    # Новые значения enum можно использовать только после коммита ALTER TYPE
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE objectstatus ADD VALUE IF NOT EXISTS 'active'")
+        op.execute("ALTER TYPE objectstatus ADD VALUE IF NOT EXISTS 'completed'")
+
+    # Обновляем статусы объектов: ACTIVE -> active, COMPLETED -> completed
+    op.execute("""
+        UPDATE objects 
+        SET status = LOWER(status::text)::objectstatus 
+        WHERE status::text IN ('ACTIVE', 'COMPLETED')
+    """)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if not inspector.has_table('objects'):
+        return
+
+    # Значения enum нельзя удалить, возвращаем данные к верхнему регистру
+    op.execute("""
+        UPDATE objects 
+        SET status = UPPER(status::text)::objectstatus 
+        WHERE status::text IN ('active', 'completed')
+    """)
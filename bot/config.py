@@ -3,6 +3,7 @@
 """
 import os
 import json
+from functools import cached_property
 from typing import List
 from dotenv import load_dotenv
 
@@ -10,6 +11,26 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# Схемы DATABASE_URL, которые приводятся к драйверу asyncpg
+_ASYNC_URL_SCHEMES = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+asyncpg": "postgresql+asyncpg",
+}
+
+
+def _normalize_async_url(url: str) -> str:
+    """Привести DATABASE_URL к виду postgresql+asyncpg://...
+    
+    Raises:
+        ValueError: если схема URL не поддерживается
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep or scheme not in _ASYNC_URL_SCHEMES:
+        raise ValueError(f"Неподдерживаемая схема DATABASE_URL: {scheme or url!r}")
+    return f"{_ASYNC_URL_SCHEMES[scheme]}://{rest}"
+
+
 class Config:
     """Класс конфигурации приложения"""
     
@@ -21,6 +42,11 @@ class Config:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://localhost/construction_bot")
+    # Пул соединений; за PgBouncer в transaction mode пулом занимается он сам,
+    # но сумма по-прежнему ограничивает число соединений (см. LimitedAsyncSession)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    USE_PGBOUNCER: bool = os.getenv("USE_PGBOUNCER", "").lower() in ("1", "true", "yes")
     
     # Admin users
     ADMIN_TELEGRAM_IDS: List[int] = []
@@ -36,6 +62,11 @@ class Config:
                 print("⚠️ Ошибка парсинга ADMIN_TELEGRAM_IDS")
                 self.ADMIN_TELEGRAM_IDS = []
     
+    @cached_property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """DATABASE_URL с драйвером asyncpg (для приложения и alembic), вычисляется один раз"""
+        return _normalize_async_url(self.DATABASE_URL)
+    
     def validate(self) -> bool:
         """Проверка наличия всех необходимых переменных"""
         errors = []
@@ -48,6 +79,11 @@ class Config:
         
         if not self.DATABASE_URL:
             errors.append("❌ DATABASE_URL не установлен")
+        else:
+            try:
+                _normalize_async_url(self.DATABASE_URL)
+            except ValueError as e:
+                errors.append(f"❌ {e}")
         
         if not self.ADMIN_TELEGRAM_IDS:
             errors.append("⚠️ ADMIN_TELEGRAM_IDS не установлен")
@@ -17,7 +17,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User, UserRole
 from database.crud import create_object
-from bot.states.add_object_states import AddObjectStates
+from bot.states.add_object_states import (
+    AddObjectStates,
+    ENTER_ADDRESS_STATE,
+    ENTER_FOREMAN_STATE,
+    ENTER_DATES_STATE,
+)
 from bot.keyboards.main_menu import get_cancel_button, get_skip_or_cancel, get_confirm_keyboard
 from bot.services.pdf_parser import (
     extract_text_from_pdf,
@@ -753,7 +758,7 @@ async def skip_step(callback: CallbackQuery, state: FSMContext):
     current_state = await state.get_state()
     await delete_message(callback.message)
 
-    if current_state == AddObjectStates.enter_address.state:
+    if current_state == ENTER_ADDRESS_STATE:
         await state.update_data(address=None)
         await state.set_state(AddObjectStates.enter_foreman)
         await callback.message.answer(
@@ -762,7 +767,7 @@ async def skip_step(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_skip_or_cancel()
         )
 
-    elif current_state == AddObjectStates.enter_foreman.state:
+    elif current_state == ENTER_FOREMAN_STATE:
         await state.update_data(foreman_name=None)
         await state.set_state(AddObjectStates.enter_dates)
         await callback.message.answer(
@@ -774,7 +779,7 @@ async def skip_step(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_skip_or_cancel()
         )
 
-    elif current_state == AddObjectStates.enter_dates.state:
+    elif current_state == ENTER_DATES_STATE:
         await state.update_data(start_date=None, end_date=None)
         await state.set_state(AddObjectStates.enter_prepayment)
         await callback.message.answer(
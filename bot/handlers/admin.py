@@ -1,23 +1,39 @@
 """
 Обработчики админ-панели для управления пользователями
 """
+from datetime import datetime, timedelta
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User, UserRole
 from database.crud import (
-    create_user,
-    get_user_by_telegram_id,
+    get_or_create_user,
     get_all_users,
+    count_users,
     delete_user,
-    update_user_active_status,
+    update_user_active_status_light,
     DeleteUserResult,
 )
 
 router = Router()
 
+USERS_PAGE_SIZE = 25
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_user_cursor(user: User) -> str:
+    # Микросекунды от эпохи: компактно, чтобы уложиться в 64 байта callback_data
+    micros = (user.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{user.id}"
+
+
+def _decode_user_cursor(micros: str, user_id: str) -> tuple[datetime, int]:
+    return _EPOCH + timedelta(microseconds=int(micros)), int(user_id)
+
 
 @router.message(F.text == "👥 Управление пользователями")
 async def admin_panel_menu(message: Message, user: User):
@@ -92,12 +108,14 @@ async def cmd_add_user(message: Message, user: User, session: AsyncSession):
         await message.answer("❌ Укажите имя пользователя после роли.")
         return
 
-    existing_user = await get_user_by_telegram_id(session, telegram_id)
+    _, created = await get_or_create_user(
+        session,
+        telegram_id,
+        defaults={"role": role, "full_name": full_name},
+        update_fields=("role", "full_name"),
+    )
 
-    if existing_user:
-        existing_user.role = role
-        existing_user.full_name = full_name
-        await session.commit()
+    if not created:
         await message.answer(
             "♻️ Пользователь обновлён.\n\n"
             f"Имя: {full_name}\n"
@@ -105,13 +123,6 @@ async def cmd_add_user(message: Message, user: User, session: AsyncSession):
         )
         return
 
-    new_user = await create_user(
-        session=session,
-        telegram_id=telegram_id,
-        role=role,
-        full_name=full_name
-    )
-
     await message.answer(
         f"✅ Пользователь добавлен!\n\n"
         f"Имя: {full_name}\n"
@@ -205,9 +216,9 @@ async def cmd_block_user(message: Message, user: User, session: AsyncSession):
         return
     
     # Блокируем пользователя
-    updated_user = await update_user_active_status(session, telegram_id, False)
+    updated = await update_user_active_status_light(session, telegram_id, False)
     
-    if updated_user:
+    if updated:
         await message.answer(
             f"✅ Пользователь с Telegram ID {telegram_id} заблокирован."
         )
@@ -246,9 +257,9 @@ async def cmd_unblock_user(message: Message, user: User, session: AsyncSession):
         return
     
     # Разблокируем пользователя
-    updated_user = await update_user_active_status(session, telegram_id, True)
+    updated = await update_user_active_status_light(session, telegram_id, True)
     
-    if updated_user:
+    if updated:
         await message.answer(
             f"✅ Пользователь с Telegram ID {telegram_id} разблокирован."
         )
@@ -258,23 +269,21 @@ async def cmd_unblock_user(message: Message, user: User, session: AsyncSession):
         )
 
 
-@router.message(Command("list_users"))
-async def cmd_list_users(message: Message, user: User, session: AsyncSession):
-    """Показать список всех пользователей"""
-    
-    if user.role != UserRole.ADMIN:
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
-    # Получаем всех пользователей
-    users = await get_all_users(session)
+async def _send_users_page(
+    message: Message,
+    session: AsyncSession,
+    cursor: Optional[tuple[datetime, int]] = None,
+) -> None:
+    users = await get_all_users(session, cursor=cursor, limit=USERS_PAGE_SIZE + 1)
+    has_more = len(users) > USERS_PAGE_SIZE
+    users = users[:USERS_PAGE_SIZE]
     
     if not users:
         await message.answer("📋 Список пользователей пуст.")
         return
     
     # Формируем список
-    text = "👥 <b>Список пользователей</b>\n\n"
+    text = "👥 <b>Список пользователей</b>\n\n" if cursor is None else ""
     
     for u in users:
         status = "✅" if u.is_active else "❌"
@@ -286,9 +295,51 @@ async def cmd_list_users(message: Message, user: User, session: AsyncSession):
         text += f"   Роль: {u.role.value}\n"
         text += f"   Добавлен: {u.created_at.strftime('%d.%m.%Y')}\n\n"
     
-    text += f"Всего пользователей: {len(users)}"
+    if cursor is None:
+        text += f"Всего пользователей: {await count_users(session)}"
+    
+    reply_markup = None
+    if has_more:
+        reply_markup = InlineKeyboardMarkup(
+            inline_keyboard=[[InlineKeyboardButton(
+                text="⬇️ Показать ещё",
+                callback_data=f"admin:users:more:{_encode_user_cursor(users[-1])}",
+            )]]
+        )
+    
+    await message.answer(text.strip(), parse_mode="HTML", reply_markup=reply_markup)
+
+
+@router.message(Command("list_users"))
+async def cmd_list_users(message: Message, user: User, session: AsyncSession):
+    """Показать список пользователей (постранично)"""
+    
+    if user.role != UserRole.ADMIN:
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+    
+    await _send_users_page(message, session)
+
+
+@router.callback_query(F.data.startswith("admin:users:more:"))
+async def list_users_more(callback: CallbackQuery, user: User, session: AsyncSession):
+    """Показать следующую страницу списка пользователей"""
+    
+    if user.role != UserRole.ADMIN:
+        await callback.answer("❌ Нет прав", show_alert=True)
+        return
+    
+    parts = callback.data.split(":")
+    try:
+        cursor = _decode_user_cursor(parts[3], parts[4])
+    except (IndexError, ValueError):
+        await callback.answer()
+        return
     
-    await message.answer(text.strip(), parse_mode="HTML")
+    # Убираем кнопку с предыдущей страницы
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await _send_users_page(callback.message, session, cursor)
+    await callback.answer()
 
 
 
@@ -30,6 +30,7 @@ from database.crud import (
     create_company_recurring_expense,
     get_company_expense_categories,
     get_company_expenses_by_category,
+    iter_company_expenses_by_category,
     get_company_recurring_categories,
     get_company_recurring_by_category,
     delete_company_expense,
@@ -144,9 +145,7 @@ def _recurring_confirm_keyboard() -> InlineKeyboardMarkup:
 
 
 async def _send_one_time_overview(sender: Sender, session: AsyncSession) -> None:
-    # Получаем все разовые расходы без группировки по категориям
-    from database.crud import get_company_expenses_by_category, get_company_expense_categories
-    
+    # Итоги берём из агрегата по категориям, сами расходы читаем одним запросом
     categories = await get_company_expense_categories(session)
 
     if not categories:
@@ -163,42 +162,21 @@ async def _send_one_time_overview(sender: Sender, session: AsyncSession) -> None
         )
         return
 
-    # Собираем все расходы из всех категорий
-    all_expenses = []
-    for category, _, _ in categories:
-        expenses = await get_company_expenses_by_category(session, category)
-        all_expenses.extend(expenses)
-    
-    if not all_expenses:
-        await _reply(
-            sender,
-            "💸 <b>Разовые расходы</b>\n\nПока нет записей.",
-            parse_mode="HTML",
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [InlineKeyboardButton(text="➕ Добавить", callback_data="company:one_time:add")],
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="company:menu")],
-                ]
-            ),
-        )
-        return
-
-    # Сортируем по дате (новые сверху)
-    all_expenses.sort(key=lambda x: x.date, reverse=True)
-    
-    overall_total = sum(exp.amount for exp in all_expenses)
+    overall_total = sum((total for _, total, _ in categories), Decimal(0))
+    records_count = sum(count for _, _, count in categories)
 
     lines = [
         "💸 <b>Разовые расходы</b>",
         f"Всего: {format_currency(overall_total)}",
-        f"Записей: {len(all_expenses)}",
+        f"Записей: {records_count}",
         "",
         "📄 Список:",
     ]
 
     keyboard = InlineKeyboardBuilder()
 
-    for exp in all_expenses:
+    # Расходы всех категорий, новые сверху
+    async for exp in iter_company_expenses_by_category(session):
         date_str = exp.date.strftime("%d.%m.%Y")
         lines.append(
             f"\n• {exp.category} — {format_currency(exp.amount)}\n"
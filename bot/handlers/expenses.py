@@ -19,7 +19,7 @@ from database.models import (
     ObjectLogType,
 )
 from database.crud import (
-    create_expense,
+    create_expense_with_log,
     create_advance,
     get_object_by_id,
     create_file,
@@ -57,22 +57,6 @@ def _work_type_label(value: str | None) -> str:
     return cleaned or "Без указания вида работ"
 
 
-async def _log_expense(
-    session: AsyncSession,
-    expense,
-    action: ObjectLogType,
-    description: str,
-    user: User,
-) -> None:
-    await create_object_log(
-        session=session,
-        object_id=expense.object_id,
-        action=action,
-        description=description,
-        user_id=user.id,
-    )
-
-
 async def _log_advance(
     session: AsyncSession,
     advance,
@@ -97,7 +81,7 @@ async def show_expense_type_menu(callback: CallbackQuery, session: AsyncSession)
 
     object_id = int(callback.data.split(":")[2])
 
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -131,7 +115,7 @@ async def start_add_expense(callback: CallbackQuery, state: FSMContext, session:
     object_id = int(parts[3])
     
     # Проверяем объект
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -411,8 +395,10 @@ async def process_expense_photo(message: Message, user: User, session: AsyncSess
     payment_source = PaymentSource.COMPANY if payment_source_str == 'company' else PaymentSource.PERSONAL
     compensation_status = CompensationStatus.PENDING if payment_source == PaymentSource.PERSONAL else None
     
-    # Создаем расход
-    expense = await create_expense(
+    source_text = "оплачено фирмой" if payment_source == PaymentSource.COMPANY else "оплачено прорабом"
+
+    # Создаем расход вместе с записью в логе объекта
+    await create_expense_with_log(
         session=session,
         object_id=data['object_id'],
         expense_type=expense_type,
@@ -420,6 +406,10 @@ async def process_expense_photo(message: Message, user: User, session: AsyncSess
         description=data['parsed_description'],
         date=date_obj,
         added_by=user.id,
+        log_description=(
+            f"Добавлен расход ({_expense_type_label(expense_type)}): "
+            f"{format_currency(data['parsed_amount'])} — {data['parsed_description']} ({source_text})"
+        ),
         photo_url=photo_url,
         payment_source=payment_source,
         compensation_status=compensation_status
@@ -427,19 +417,6 @@ async def process_expense_photo(message: Message, user: User, session: AsyncSess
     
     await state.clear()
 
-    source_text = "оплачено фирмой" if payment_source == PaymentSource.COMPANY else "оплачено прорабом"
-
-    await _log_expense(
-        session=session,
-        expense=expense,
-        action=ObjectLogType.EXPENSE_CREATED,
-        description=(
-            f"Добавлен расход ({_expense_type_label(expense.type)}): "
-            f"{format_currency(expense.amount)} — {expense.description} ({source_text})"
-        ),
-        user=user,
-    )
-
     await message.answer(
         f"✅ <b>Расход добавлен!</b>\n\n"
         f"Объект: {data['object_name']}\n"
@@ -465,7 +442,9 @@ async def skip_expense_photo(callback: CallbackQuery, user: User, session: Async
     payment_source = PaymentSource.COMPANY if payment_source_str == 'company' else PaymentSource.PERSONAL
     compensation_status = CompensationStatus.PENDING if payment_source == PaymentSource.PERSONAL else None
     
-    expense = await create_expense(
+    source_text = "оплачено фирмой" if payment_source == PaymentSource.COMPANY else "оплачено прорабом"
+
+    await create_expense_with_log(
         session=session,
         object_id=data['object_id'],
         expense_type=expense_type,
@@ -473,25 +452,16 @@ async def skip_expense_photo(callback: CallbackQuery, user: User, session: Async
         description=data['parsed_description'],
         date=date_obj,
         added_by=user.id,
+        log_description=(
+            f"Добавлен расход ({_expense_type_label(expense_type)}): "
+            f"{format_currency(data['parsed_amount'])} — {data['parsed_description']} ({source_text})"
+        ),
         payment_source=payment_source,
         compensation_status=compensation_status
     )
     
     await state.clear()
 
-    source_text = "оплачено фирмой" if payment_source == PaymentSource.COMPANY else "оплачено прорабом"
-
-    await _log_expense(
-        session=session,
-        expense=expense,
-        action=ObjectLogType.EXPENSE_CREATED,
-        description=(
-            f"Добавлен расход ({_expense_type_label(expense.type)}): "
-            f"{format_currency(expense.amount)} — {expense.description} ({source_text})"
-        ),
-        user=user,
-    )
-
     await send_new_message(
         callback,
         f"✅ <b>Расход добавлен!</b>\n\n"
@@ -512,7 +482,7 @@ async def start_add_advance(callback: CallbackQuery, state: FSMContext, session:
     object_id = int(callback.data.split(":")[2])
     
     # Проверяем объект
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -5,7 +5,7 @@ import math
 import hashlib
 import logging
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
 from typing import Optional
 
@@ -22,18 +22,21 @@ from database.models import (
     PaymentSource,
     CompensationStatus,
     ExpenseType,
+    ObjectLog,
     ObjectLogType,
     FileType,
 )
 from database.crud import (
-    get_objects_by_status,
+    get_object_summaries_by_status,
     get_object_by_id,
     update_object_status,
-    get_expenses_by_object,
+    get_expense_rows_by_object,
+    get_expense_totals_by_type,
     get_expense_by_id,
     update_compensation_status,
     get_file_by_id,
-    get_advances_by_object,
+    get_advance_rows_by_object,
+    iter_advances_by_object,
     delete_expense,
     update_expense,
     get_advance_by_id,
@@ -43,6 +46,8 @@ from database.crud import (
     get_object_logs,
     delete_object,
     get_files_by_object,
+    count_files_by_object_and_type,
+    get_object_financial_summary,
 )
 from bot.keyboards.objects_kb import (
     get_objects_list_keyboard,
@@ -174,12 +179,35 @@ def _normalize_page(page: int, total_pages: int) -> int:
     return max(1, min(page, total_pages))
 
 
-def _build_navigation_buttons(prefix: str, object_id: int, page: int, total_pages: int) -> list[InlineKeyboardButton]:
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_log_cursor(log: ObjectLog) -> str:
+    # Микросекунды от эпохи: компактно, чтобы уложиться в 64 байта callback_data
+    micros = (log.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{log.id}"
+
+
+def _decode_log_cursor(micros: str, log_id: str) -> tuple[datetime, int]:
+    return _EPOCH + timedelta(microseconds=int(micros)), int(log_id)
+
+
+def _build_logs_navigation(object_id: int, page: int, total_pages: int, logs: list[ObjectLog]) -> list[InlineKeyboardButton]:
+    prefix = f"object:view_logs:{object_id}"
     buttons: list[InlineKeyboardButton] = []
     if page > 1:
-        buttons.append(InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=f"{prefix}:{object_id}:{page - 1}"))
+        callback_data = (
+            f"{prefix}:1" if page == 2
+            else f"{prefix}:{page - 1}:p:{_encode_log_cursor(logs[0])}"
+        )
+        buttons.append(InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=callback_data))
     if page < total_pages:
-        buttons.append(InlineKeyboardButton(text="➡️ Следующая", callback_data=f"{prefix}:{object_id}:{page + 1}"))
+        buttons.append(
+            InlineKeyboardButton(
+                text="➡️ Следующая",
+                callback_data=f"{prefix}:{page + 1}:n:{_encode_log_cursor(logs[-1])}",
+            )
+        )
     return buttons
 
 
@@ -304,7 +332,7 @@ async def build_objects_list_view(
     session: AsyncSession,
     status: ObjectStatus,
 ) -> tuple[str, InlineKeyboardMarkup]:
-    objects = await get_objects_by_status(session, status)
+    objects = await get_object_summaries_by_status(session, status)
     status_text = "Текущие" if status == ObjectStatus.ACTIVE else "Завершённые"
 
     if not objects:
@@ -323,14 +351,14 @@ async def build_objects_list_view(
 
 
 async def _send_expenses_overview(callback: CallbackQuery, session: AsyncSession, object_id: int) -> None:
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
 
-    expenses = await get_expenses_by_object(session, object_id)
+    grouped = await get_expense_totals_by_type(session, object_id)
 
-    if not expenses:
+    if not grouped:
         await send_new_message(
             callback,
             f"📋 <b>Расходы объекта</b>\n\n🏗️ {obj.name}\n\nПока нет добавленных расходов.",
@@ -341,28 +369,8 @@ async def _send_expenses_overview(callback: CallbackQuery, session: AsyncSession
         )
         return
 
-    overall_total = sum((expense.amount for expense in expenses), Decimal(0))
-
-    grouped: dict[ExpenseType, dict[str, object]] = {}
-    for expense in expenses:
-        bucket = grouped.setdefault(
-            expense.type,
-            {
-                "total": Decimal(0),
-                "count": 0,
-                "personal_pending": 0,
-                "personal_total": Decimal(0),
-                "company_total": Decimal(0),
-            },
-        )
-        bucket["total"] += expense.amount
-        bucket["count"] += 1
-        if expense.payment_source == PaymentSource.PERSONAL:
-            bucket["personal_total"] += expense.amount
-            if expense.compensation_status == CompensationStatus.PENDING:
-                bucket["personal_pending"] += 1
-        else:
-            bucket["company_total"] += expense.amount
+    overall_total = sum((bucket["total"] for bucket in grouped.values()), Decimal(0))
+    expenses_count = sum(bucket["count"] for bucket in grouped.values())
 
     type_rows = []
     for expense_type in [ExpenseType.SUPPLIES, ExpenseType.TRANSPORT, ExpenseType.OVERHEAD]:
@@ -395,7 +403,7 @@ async def _send_expenses_overview(callback: CallbackQuery, session: AsyncSession
     lines = [
         "📋 <b>Расходы объекта</b>",
         f"🏗️ {obj.name}",
-        f"Всего расходов: {len(expenses)}",
+        f"Всего расходов: {expenses_count}",
         f"Общая сумма: {format_currency(overall_total)}",
         "━━━━━━━━━━━━━━━━━━━━━━",
         "📊 <b>По категориям:</b>",
@@ -428,7 +436,7 @@ async def _send_expenses_type_page(
     expense_token: str,
     page: int,
 ) -> None:
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -438,8 +446,7 @@ async def _send_expenses_type_page(
         await _send_expenses_overview(callback, session, object_id)
         return
 
-    expenses = await get_expenses_by_object(session, object_id)
-    filtered = [expense for expense in expenses if expense.type == expense_type]
+    filtered = await get_expense_rows_by_object(session, object_id, expense_type)
 
     if not filtered:
         await _send_expenses_overview(callback, session, object_id)
@@ -518,12 +525,12 @@ async def _send_expenses_type_page(
 
 
 async def _send_advances_overview(callback: CallbackQuery, session: AsyncSession, object_id: int) -> None:
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
 
-    advances = await get_advances_by_object(session, object_id)
+    advances = await get_advance_rows_by_object(session, object_id)
 
     if not advances:
         await send_new_message(
@@ -620,25 +627,23 @@ async def _send_advances_worktype_page(
     work_type_token: str,
     page: int,
 ) -> None:
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
 
-    advances = await get_advances_by_object(session, object_id)
-
-    grouped: dict[str, dict[str, object]] = {}
-    for advance in advances:
-        token = _make_work_type_token(advance.work_type)
-        bucket = grouped.setdefault(
-            token,
-            {
+    # Держим в памяти только авансы выбранного вида работ
+    bucket: Optional[dict[str, object]] = None
+    async for advance in iter_advances_by_object(session, object_id):
+        if _make_work_type_token(advance.work_type) != work_type_token:
+            continue
+        if bucket is None:
+            bucket = {
                 "label": _display_work_type(advance.work_type),
                 "advances": [],
                 "min_date": None,
                 "max_date": None,
             }
-        )
         bucket["advances"].append(advance)
         if advance.date:
             if bucket["min_date"] is None or advance.date < bucket["min_date"]:
@@ -646,7 +651,6 @@ async def _send_advances_worktype_page(
             if bucket["max_date"] is None or advance.date > bucket["max_date"]:
                 bucket["max_date"] = advance.date
 
-    bucket = grouped.get(work_type_token)
     if not bucket:
         await _send_advances_overview(callback, session, object_id)
         return
@@ -916,13 +920,19 @@ async def _send_logs_page(
     session: AsyncSession,
     object_id: int,
     page: int,
+    cursor: Optional[tuple[datetime, int]] = None,
+    backward: bool = False,
 ) -> None:
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
 
-    logs, total = await get_object_logs(session, object_id, page, LOGS_PAGE_SIZE)
+    logs, total = await get_object_logs(session, object_id, LOGS_PAGE_SIZE, cursor, backward)
+    if not logs and cursor is not None:
+        # Курсор устарел — начинаем с первой страницы
+        page = 1
+        logs, total = await get_object_logs(session, object_id, LOGS_PAGE_SIZE)
 
     if total == 0:
         await send_new_message(
@@ -957,7 +967,7 @@ async def _send_logs_page(
         )
 
     keyboard = InlineKeyboardBuilder()
-    nav_buttons = _build_navigation_buttons("object:view_logs", object_id, page, total_pages)
+    nav_buttons = _build_logs_navigation(object_id, page, total_pages, logs)
     if nav_buttons:
         keyboard.row(*nav_buttons)
 
@@ -1004,22 +1014,25 @@ async def show_object_card(callback: CallbackQuery, user: User, session: AsyncSe
     # Извлекаем ID объекта из callback_data
     object_id = int(callback.data.split(":")[2])
     
-    # Получаем объект из БД с загруженными связями
-    obj = await get_object_by_id(session, object_id, load_relations=True)
+    # Получаем объект из БД (суммы считаются отдельными агрегатами)
+    obj = await get_object_by_id(session, object_id)
     
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
     
-    # Получаем файлы из объекта (relation подгружена при load_relations=True)
-    files = getattr(obj, "files", []) or []
+    # Получаем количество файлов по типам и суммы расходов/авансов
+    file_counts = await count_files_by_object_and_type(session, object_id)
+    summary = await get_object_financial_summary(session, object_id)
+    total_advances = summary["advances"]
+    expense_totals = summary["expenses"]
     
     # Генерируем отчет
     bot_username = None
     if callback.message:
         bot_username = await get_bot_username(callback.message.bot)
 
-    report_text = generate_object_report(obj, files, bot_username)
+    report_text = generate_object_report(obj, file_counts, bot_username, total_advances, expense_totals)
     
     # Отправляем отчет с клавиатурой
     await send_new_message(
@@ -1044,7 +1057,7 @@ async def show_object_documents(callback: CallbackQuery, user: User, session: As
         object_id,
         callback.from_user.id,
     )
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -1093,7 +1106,7 @@ async def list_object_documents(callback: CallbackQuery, user: User, session: As
         await callback.answer()
         return
 
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -1172,7 +1185,7 @@ async def add_object_document(callback: CallbackQuery, user: User, session: Asyn
         await callback.answer()
         return
 
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
@@ -1211,7 +1224,7 @@ async def send_object_document(callback: CallbackQuery, session: AsyncSession):
     token = parts[5]
     info = _document_info(token)
 
-    file = await get_file_by_id(session, file_id)
+    file = await get_file_by_id(session, file_id, include_blob=False)
     if not file or file.object_id != object_id:
         await callback.answer("❌ Файл не найден", show_alert=True)
         return
@@ -1325,7 +1338,7 @@ async def confirm_complete_object(callback: CallbackQuery, user: User, session:
     object_id = int(callback.data.split(":")[2])
     
     # Получаем объект
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
@@ -1404,7 +1417,7 @@ async def confirm_restore_object(callback: CallbackQuery, user: User, session: A
     object_id = int(callback.data.split(":")[2])
     
     # Получаем объект
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
     
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
@@ -1515,7 +1528,13 @@ async def view_object_logs(callback: CallbackQuery, user: User, session: AsyncSe
     object_id = int(parts[2])
     page = int(parts[3]) if len(parts) > 3 else 1
 
-    await _send_logs_page(callback, session, object_id, page)
+    cursor = None
+    backward = False
+    if len(parts) > 6:
+        backward = parts[4] == "p"
+        cursor = _decode_log_cursor(parts[5], parts[6])
+
+    await _send_logs_page(callback, session, object_id, page, cursor, backward)
     await callback.answer()
 
 
@@ -2235,7 +2254,7 @@ async def request_delete_object(callback: CallbackQuery, user: User, session: As
         return
 
     object_id = int(callback.data.split(":")[2])
-    obj = await get_object_by_id(session, object_id, load_relations=False)
+    obj = await get_object_by_id(session, object_id)
 
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
@@ -2271,7 +2290,7 @@ async def confirm_delete_object(callback: CallbackQuery, user: User, session: As
         await callback.answer("❌ Не удалось удалить объект", show_alert=True)
         return
 
-    objects = await get_objects_by_status(session, ObjectStatus.COMPLETED)
+    objects = await get_object_summaries_by_status(session, ObjectStatus.COMPLETED)
     if objects:
         text = (
             "🗑 <b>Объект удалён</b>\n\n"
@@ -10,10 +10,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User, UserRole, ObjectStatus
 from database.crud import (
-    get_objects_by_status,
+    get_object_summaries_by_status,
     get_object_by_id,
-    get_files_by_object,
+    count_files_by_object_and_type,
+    get_object_financial_summary,
     get_objects_by_period,
+    get_period_expense_totals,
     get_company_expenses_for_period,
     get_financial_years,
 )
@@ -50,7 +52,7 @@ async def select_object_for_report(callback: CallbackQuery, user: User, session:
     await state.clear()
     
     # Получаем завершенные объекты
-    objects = await get_objects_by_status(session, ObjectStatus.COMPLETED)
+    objects = await get_object_summaries_by_status(session, ObjectStatus.COMPLETED)
     
     await send_new_message(
         callback,
@@ -72,22 +74,25 @@ async def generate_object_report_callback(callback: CallbackQuery, user: User, s
     
     object_id = int(callback.data.split(":")[2])
     
-    # Получаем объект с загруженными связями
-    obj = await get_object_by_id(session, object_id, load_relations=True)
+    # Получаем объект (суммы считаются отдельными агрегатами)
+    obj = await get_object_by_id(session, object_id)
     
     if not obj:
         await callback.answer("❌ Объект не найден", show_alert=True)
         return
     
-    # Получаем файлы
-    files = await get_files_by_object(session, object_id)
+    # Получаем количество файлов по типам и суммы расходов/авансов
+    file_counts = await count_files_by_object_and_type(session, object_id)
+    summary = await get_object_financial_summary(session, object_id)
+    total_advances = summary["advances"]
+    expense_totals = summary["expenses"]
     
     # Генерируем отчет
     bot_username = None
     if callback.message:
         bot_username = await get_bot_username(callback.message.bot)
 
-    report = generate_object_report(obj, files, bot_username)
+    report = generate_object_report(obj, file_counts, bot_username, total_advances, expense_totals)
     
     await delete_message(callback.message)
 
@@ -158,8 +163,9 @@ async def generate_year_report(callback: CallbackQuery, user: User, session: Asy
     end_date = datetime(year, 12, 31, 23, 59, 59)
 
     objects = await get_objects_by_period(session, start_date, end_date)
+    expense_totals = await get_period_expense_totals(session, start_date, end_date)
     company_totals = await get_company_expenses_for_period(session, start_date, end_date)
-    report = generate_period_report(objects, f"{year} год", company_totals)
+    report = generate_period_report(objects, f"{year} год", company_totals, expense_totals)
 
     await send_new_message(callback, report, parse_mode="HTML")
     await callback.answer("✅ Отчёт готов")
@@ -217,8 +223,9 @@ async def generate_month_report(callback: CallbackQuery, user: User, session: As
     end_date = datetime(year, month, last_day, 23, 59, 59)
 
     objects = await get_objects_by_period(session, start_date, end_date)
+    expense_totals = await get_period_expense_totals(session, start_date, end_date)
     company_totals = await get_company_expenses_for_period(session, start_date, end_date)
-    report = generate_period_report(objects, f"{MONTH_NAMES[month - 1]} {year}", company_totals)
+    report = generate_period_report(objects, f"{MONTH_NAMES[month - 1]} {year}", company_totals, expense_totals)
 
     await send_new_message(callback, report, parse_mode="HTML")
     await callback.answer("✅ Отчёт готов")
@@ -296,12 +303,13 @@ async def process_date_to(message: Message, user: User, session: AsyncSession, s
     
     # Получаем объекты за период
     objects = await get_objects_by_period(session, date_from, date_to)
+    expense_totals = await get_period_expense_totals(session, date_from, date_to)
     
     # Генерируем отчет
     period_str = f"{date_from.strftime('%d.%m.%Y')} — {date_to.strftime('%d.%m.%Y')}"
     company_totals = await get_company_expenses_for_period(session, date_from, date_to)
 
-    report = generate_period_report(objects, period_str, company_totals)
+    report = generate_period_report(objects, period_str, company_totals, expense_totals)
     
     await message.answer(report, parse_mode="HTML")
 
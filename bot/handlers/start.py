@@ -53,7 +53,7 @@ async def cmd_start(message: Message, user: User, state: FSMContext, session: As
         except (IndexError, ValueError):
             await message.answer("❌ Неверная ссылка на документы.")
         else:
-            obj = await get_object_by_id(session, object_id, load_relations=False)
+            obj = await get_object_by_id(session, object_id)
             if obj:
                 files = await get_files_by_object(session, object_id)
                 grouped = group_document_files(files)
@@ -2,27 +2,40 @@
 Главный файл бота - точка входа
 """
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.exceptions import TelegramAPIError
 from aiogram.types import BotCommand
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.config import config
 from database.database import async_session_maker, init_db, close_db
 from database.models import UserRole
-from database.crud import create_user, get_user_by_telegram_id
+from database.crud import create_user, get_user_by_telegram_id, invalidate_user_cache, start_request_cache
 from bot.middlewares.auth_middleware import AuthMiddleware
 
 # Импортируем все роутеры
 from bot.handlers import start, objects, add_object, expenses, reports, admin, company_expenses
 
-# Настройка логирования
+# Настройка логирования: обработчики пишут в очередь, а вывод в stdout
+# выполняет отдельный поток, чтобы запись логов не блокировала event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+)
+_log_listener = logging.handlers.QueueListener(_log_queue, _stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout
+    handlers=[logging.handlers.QueueHandler(_log_queue)],
 )
 logger = logging.getLogger(__name__)
 
@@ -32,9 +45,23 @@ class DatabaseMiddleware:
     """Middleware для добавления сессии БД в контекст"""
     
     async def __call__(self, handler, event, data):
+        # Число одновременно занятых соединений ограничивает сама сессия
+        # (LimitedAsyncSession): слот берётся при первом запросе к БД
         async with async_session_maker() as session:
             data["session"] = session
-            return await handler(event, data)
+            start_request_cache(session)
+            try:
+                result = await handler(event, data)
+            except TelegramAPIError:
+                # Ошибка ответа в Telegram не должна откатывать уже внесенные изменения
+                await session.commit()
+                raise
+            except Exception:
+                await session.rollback()
+                raise
+            # Все изменения обработчика фиксируются одним коммитом
+            await session.commit()
+            return result
 
 
 async def set_bot_commands(bot: Bot):
@@ -75,8 +102,10 @@ async def initialize_admins():
             elif existing_user.role != UserRole.ADMIN:
                 # Обновляем роль на админа
                 existing_user.role = UserRole.ADMIN
-                await session.commit()
+                invalidate_user_cache(telegram_id)
                 logger.info(f"✅ Пользователь {telegram_id} повышен до администратора")
+        
+        await session.commit()
 
 
 async def main():
@@ -2,6 +2,7 @@
 AI сервис для парсинга текста и голоса через OpenAI API
 """
 import json
+import logging
 from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Optional
@@ -9,6 +10,8 @@ import aiofiles
 from openai import AsyncOpenAI
 from bot.config import config
 
+logger = logging.getLogger(__name__)
+
 # Инициализация OpenAI клиента
 client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 
@@ -79,7 +82,7 @@ async def parse_expense_text(text: str, expense_type: str = "расход") -> D
         }
         
     except Exception as e:
-        print(f"❌ Ошибка парсинга расхода: {e}")
+        logger.error("❌ Ошибка парсинга расхода: %s", e)
         # Возвращаем дефолтные значения
         return {
             "date": datetime.now().strftime("%Y-%m-%d"),
@@ -141,7 +144,7 @@ async def parse_advance_text(text: str) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Ошибка парсинга аванса: {e}")
+        logger.error("❌ Ошибка парсинга аванса: %s", e)
         return {
             "worker_name": "",
             "work_type": "",
@@ -178,7 +181,7 @@ async def transcribe_voice(file_path: str) -> str:
         return response.text
         
     except Exception as e:
-        print(f"❌ Ошибка транскрибации голоса: {e}")
+        logger.error("❌ Ошибка транскрибации голоса: %s", e)
         return ""
 
 
@@ -293,7 +296,7 @@ async def parse_company_expense_text(text: str, kind: str = "one_time") -> Dict:
         }
 
     except Exception as e:
-        print(f"❌ Ошибка парсинга корпоративного расхода: {e}")
+        logger.error("❌ Ошибка парсинга корпоративного расхода: %s", e)
 
         if kind == "one_time":
             return {
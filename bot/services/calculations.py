@@ -1,9 +1,15 @@
 """
 Сервис расчета прибыли, ФЗП и рентабельности
 """
-from decimal import Decimal
+from decimal import Context, Decimal, localcontext
+from functools import lru_cache
 from typing import Dict
-from database.models import ConstructionObject
+from database.models import ConstructionObject, ExpenseType
+
+
+# Контекст для денежной арифметики: 18 значащих цифр с запасом покрывают
+# суммы в рублях с копейками, при этом операции дешевле, чем с prec=28
+MONEY_CONTEXT = Context(prec=18)
 
 
 def calculate_profit_data(obj: ConstructionObject) -> Dict[str, Decimal]:
@@ -24,90 +30,144 @@ def calculate_profit_data(obj: ConstructionObject) -> Dict[str, Decimal]:
         Dict с финансовыми показателями
     """
     
-    # Всего поступлений
-    total_income = obj.prepayment + obj.final_payment
+    # Расчет фактических расходов по типам (один проход по расходам)
+    facts = {
+        ExpenseType.SUPPLIES: Decimal(0),
+        ExpenseType.TRANSPORT: Decimal(0),
+        ExpenseType.OVERHEAD: Decimal(0),
+    }
+    for expense in obj.expenses:
+        if expense.type in facts:
+            facts[expense.type] += expense.amount
+
+    return calculate_profit_data_from_totals(obj, facts)
+
+
+def calculate_profit_data_from_totals(
+    obj: ConstructionObject,
+    expense_totals: Dict[ExpenseType, Decimal],
+) -> Dict[str, Decimal]:
+    """
+    Рассчитать финансовые показатели объекта по готовым суммам расходов
     
-    # Разница по С3
-    s3_difference = obj.estimate_s3 - obj.actual_s3_discount
+    Не обращается к obj.expenses, поэтому объект можно загружать без связей.
     
-    # ФЗП
-    fzp_master = obj.estimate_works * Decimal("0.45")  # 45%
-    fzp_foreman = obj.estimate_works * Decimal("0.10")  # 10%
-    fzp_total = fzp_master + fzp_foreman
+    Args:
+        obj: Объект строительства
+        expense_totals: Суммы фактических расходов по типам (посчитанные в БД)
+        
+    Returns:
+        Dict с финансовыми показателями
+    """
+    supplies_fact = expense_totals.get(ExpenseType.SUPPLIES, Decimal(0))
+    transport_fact = expense_totals.get(ExpenseType.TRANSPORT, Decimal(0))
+    overhead_fact = expense_totals.get(ExpenseType.OVERHEAD, Decimal(0))
+
+    # Показатели зависят только от значений, поэтому одинаковые входные
+    # данные (повторная отрисовка того же объекта) берутся из кеша
+    data = _profit_data_from_values(
+        obj.prepayment,
+        obj.final_payment,
+        obj.estimate_s3,
+        obj.actual_s3_discount,
+        obj.estimate_works,
+        obj.estimate_supplies,
+        obj.estimate_overhead,
+        obj.estimate_transport,
+        supplies_fact,
+        transport_fact,
+        overhead_fact,
+    )
+    return dict(data)
+
+
+@lru_cache(maxsize=512)
+def _profit_data_from_values(
+    prepayment: Decimal,
+    final_payment: Decimal,
+    estimate_s3: Decimal,
+    actual_s3_discount: Decimal,
+    estimate_works: Decimal,
+    estimate_supplies: Decimal,
+    estimate_overhead: Decimal,
+    estimate_transport: Decimal,
+    supplies_fact: Decimal,
+    transport_fact: Decimal,
+    overhead_fact: Decimal,
+) -> Dict[str, Decimal]:
+    """Рассчитать показатели по сметным и фактическим суммам"""
+
+    with localcontext(MONEY_CONTEXT):
+        # Всего поступлений
+        total_income = prepayment + final_payment
     
-    # Прибыль фирмы с работ (остаток после ФЗП)
-    work_profit = obj.estimate_works - fzp_total
+        # Разница по С3
+        s3_difference = estimate_s3 - actual_s3_discount
     
-    # Расчет фактических расходов по типам
-    supplies_fact = sum(
-        expense.amount for expense in obj.expenses 
-        if expense.type.value == "supplies"
-    )
-    transport_fact = sum(
-        expense.amount for expense in obj.expenses 
-        if expense.type.value == "transport"
-    )
-    overhead_fact = sum(
-        expense.amount for expense in obj.expenses 
-        if expense.type.value == "overhead"
-    )
+        # ФЗП
+        fzp_master = estimate_works * Decimal("0.45")  # 45%
+        fzp_foreman = estimate_works * Decimal("0.10")  # 10%
+        fzp_total = fzp_master + fzp_foreman
     
-    # Разницы
-    supplies_difference = obj.estimate_supplies - supplies_fact
-    overhead_difference = obj.estimate_overhead - overhead_fact
-    transport_difference = obj.estimate_transport - transport_fact
+        # Прибыль фирмы с работ (остаток после ФЗП)
+        work_profit = estimate_works - fzp_total
     
-    # Общая прибыль
-    total_profit = (
-        s3_difference +
-        work_profit +
-        supplies_difference +
-        overhead_difference +
-        transport_difference
-    )
+        # Разницы
+        supplies_difference = estimate_supplies - supplies_fact
+        overhead_difference = estimate_overhead - overhead_fact
+        transport_difference = estimate_transport - transport_fact
     
-    # Общие расходы
-    total_expenses = (
-        obj.actual_s3_discount +
-        fzp_total +
-        supplies_fact +
-        overhead_fact +
-        transport_fact
-    )
+        # Общая прибыль
+        total_profit = (
+            s3_difference +
+            work_profit +
+            supplies_difference +
+            overhead_difference +
+            transport_difference
+        )
+    
+        # Общие расходы
+        total_expenses = (
+            actual_s3_discount +
+            fzp_total +
+            supplies_fact +
+            overhead_fact +
+            transport_fact
+        )
     
-    # Рентабельность
-    profitability = (total_profit / total_income * 100) if total_income > 0 else Decimal(0)
+        # Рентабельность
+        profitability = (total_profit / total_income * 100) if total_income > 0 else Decimal(0)
     
     return {
         # Доходы
         "total_income": total_income,
-        "prepayment": obj.prepayment,
-        "final_payment": obj.final_payment,
+        "prepayment": prepayment,
+        "final_payment": final_payment,
         
         # С3
-        "estimate_s3": obj.estimate_s3,
-        "actual_s3_discount": obj.actual_s3_discount,
+        "estimate_s3": estimate_s3,
+        "actual_s3_discount": actual_s3_discount,
         "s3_difference": s3_difference,
         
         # Работы и ФЗП
-        "estimate_works": obj.estimate_works,
+        "estimate_works": estimate_works,
         "fzp_master": fzp_master,
         "fzp_foreman": fzp_foreman,
         "fzp_total": fzp_total,
         "work_profit": work_profit,
         
         # Расходники
-        "estimate_supplies": obj.estimate_supplies,
+        "estimate_supplies": estimate_supplies,
         "supplies_fact": supplies_fact,
         "supplies_difference": supplies_difference,
         
         # Накладные
-        "estimate_overhead": obj.estimate_overhead,
+        "estimate_overhead": estimate_overhead,
         "overhead_fact": overhead_fact,
         "overhead_difference": overhead_difference,
         
         # Транспорт
-        "estimate_transport": obj.estimate_transport,
+        "estimate_transport": estimate_transport,
         "transport_fact": transport_fact,
         "transport_difference": transport_difference,
         
@@ -118,11 +178,13 @@ def calculate_profit_data(obj: ConstructionObject) -> Dict[str, Decimal]:
     }
 
 
+@lru_cache(maxsize=4096)
 def format_currency(amount: Decimal) -> str:
     """Форматировать сумму в рублях"""
     return f"{amount:,.2f}₽".replace(",", " ")
 
 
+@lru_cache(maxsize=4096)
 def format_percentage(value: Decimal) -> str:
     """Форматировать процент"""
     return f"{value:.2f}%"
@@ -1,14 +1,20 @@
 """
 Сервис для работы с файлами (хранение в PostgreSQL)
 """
-import io
+import logging
+import tempfile
 from typing import Optional, BinaryIO
 from aiogram import Bot
 from aiogram.types import PhotoSize, Document, File as TgFile
 from database.models import File, FileType
-from database.crud import create_file, get_files_by_object
+from database.crud import create_file_from_stream, get_files_by_object
 from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
+
+# Порог, после которого скачиваемый файл сбрасывается из памяти на диск
+DOWNLOAD_SPOOL_SIZE = 2 * 1024 * 1024
+
 
 class FileService:
     """Класс для работы с файлами"""
@@ -21,6 +27,22 @@ class FileService:
             bot: Экземпляр бота
         """
         self.bot = bot
+
+    async def _download(self, file_path: str) -> tuple[BinaryIO, int]:
+        """
+        Скачать файл из Telegram во временный буфер
+
+        Небольшие файлы остаются в памяти, крупные сбрасываются на диск.
+        Буфер возвращается в начало и читается при записи в БД частями.
+
+        Returns:
+            Буфер с содержимым файла и его размер в байтах
+        """
+        buffer = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+        await self.bot.download_file(file_path, buffer, seek=False)
+        file_size = buffer.tell()
+        buffer.seek(0)
+        return buffer, file_size
     
     async def save_photo(
         self,
@@ -45,28 +67,26 @@ class FileService:
             # Получаем файл из Telegram
             file: TgFile = await self.bot.get_file(photo.file_id)
             
-            # Скачиваем файл в память
-            file_bytes = io.BytesIO()
-            await self.bot.download_file(file.file_path, file_bytes)
-            file_content = file_bytes.getvalue()
+            # Скачиваем файл
+            buffer, file_size = await self._download(file.file_path)
             
             # Сохраняем в БД
             file_data = {
                 "object_id": object_id,
                 "file_type": file_type,
                 "telegram_file_id": photo.file_id,
-                "file_data": file_content,
                 "filename": f"photo_{photo.file_id}.jpg",
                 "mime_type": "image/jpeg",
-                "file_size": len(file_content)
+                "file_size": file_size
             }
             
-            db_file = await create_file(session, file_data)
-            print(f"✅ Фото сохранено в БД (ID: {db_file.id}, размер: {len(file_content)} байт)")
+            with buffer:
+                db_file = await create_file_from_stream(session, file_data, buffer)
+            logger.debug("✅ Фото сохранено в БД (ID: %s, размер: %d байт)", db_file.id, file_size)
             return db_file
             
         except Exception as e:
-            print(f"❌ Ошибка сохранения фото: {e}")
+            logger.error("❌ Ошибка сохранения фото: %s", e)
             return None
     
     async def save_document(
@@ -92,28 +112,26 @@ class FileService:
             # Получаем файл из Telegram
             file: TgFile = await self.bot.get_file(document.file_id)
             
-            # Скачиваем файл в память
-            file_bytes = io.BytesIO()
-            await self.bot.download_file(file.file_path, file_bytes)
-            file_content = file_bytes.getvalue()
+            # Скачиваем файл
+            buffer, file_size = await self._download(file.file_path)
             
             # Сохраняем в БД
             file_data = {
                 "object_id": object_id,
                 "file_type": file_type,
                 "telegram_file_id": document.file_id,
-                "file_data": file_content,
                 "filename": document.file_name or f"document_{document.file_id}",
                 "mime_type": document.mime_type,
-                "file_size": document.file_size
+                "file_size": file_size
             }
             
-            db_file = await create_file(session, file_data)
-            print(f"✅ Документ сохранён в БД (ID: {db_file.id}, размер: {document.file_size} байт)")
+            with buffer:
+                db_file = await create_file_from_stream(session, file_data, buffer)
+            logger.debug("✅ Документ сохранён в БД (ID: %s, размер: %d байт)", db_file.id, file_size)
             return db_file
             
         except Exception as e:
-            print(f"❌ Ошибка сохранения документа: {e}")
+            logger.error("❌ Ошибка сохранения документа: %s", e)
             return None
     
     async def get_file_data(
@@ -141,7 +159,7 @@ class FileService:
             return None
             
         except Exception as e:
-            print(f"❌ Ошибка получения файла: {e}")
+            logger.error("❌ Ошибка получения файла: %s", e)
             return None
     
     async def get_object_files(
@@ -162,15 +180,10 @@ class FileService:
             Список файлов
         """
         try:
-            files = await get_files_by_object(session, object_id)
-            
-            if file_type:
-                files = [f for f in files if f.file_type == file_type]
-            
-            return files
+            return await get_files_by_object(session, object_id, file_type=file_type)
             
         except Exception as e:
-            print(f"❌ Ошибка получения списка файлов: {e}")
+            logger.error("❌ Ошибка получения списка файлов: %s", e)
             return []
 
 
@@ -1,17 +1,189 @@
 """Сервис для обработки PDF смет и извлечения структурированных данных для объекта."""
 import asyncio
 import json
-from typing import Any, Dict
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional
 
 import pdfplumber
 from openai import AsyncOpenAI
 
 from bot.config import config
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
 
 _openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 
 
+def _dumps(data: Any) -> str:
+    """Сериализует данные в JSON (UTF-8 без экранирования кириллицы)."""
+
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _loads(raw: str) -> Any:
+    """Разбирает JSON (orjson.JSONDecodeError наследует json.JSONDecodeError)."""
+
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Выражения, по которым строка сметы относится к материалам С3
+_C3_MARKERS = (
+    "облицовочный элемент ступень",
+    "облицовочный элемент плита",
+    'покрытие финишное с3 "тритон"',
+    'смесь затирочная эпоксидная с3 "зубр"',
+)
+
+_QUOTES_TRANSLATION = str.maketrans({"«": '"', "»": '"', "“": '"', "”": '"', "„": '"'})
+
+_NUMBER = r"\d{1,3}(?:[ \u00a0]?\d{3})*(?!\d)"
+
+_AMOUNT_RE = re.compile(rf"({_NUMBER}[,.]\d{{2}})\s*(?:руб\.?|₽)?", re.IGNORECASE)
+
+# Сумма после подписи: копейки необязательны
+_LABELED_AMOUNT = rf"({_NUMBER}(?:[,.]\d{{1,2}})?)"
+
+_DATE = r"\d{2}\.\d{2}\.\d{4}"
+
+# Поля карточки с явной подписью в шаблоне сметы: «Подпись: значение»
+_LABELED_TEXT_PATTERNS = {
+    "name": re.compile(r"^\s*Объект\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    "address": re.compile(r"^\s*Адрес(?:\s+объекта)?\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    "foreman_name": re.compile(r"^\s*(?:Бригадир|Прораб)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+}
+
+_LABELED_AMOUNT_PATTERNS = {
+    "prepayment": re.compile(rf"Предоплата[^\d\n]*{_LABELED_AMOUNT}", re.IGNORECASE),
+    "final_payment": re.compile(rf"Окончательн\w*\s+оплата[^\d\n]*{_LABELED_AMOUNT}", re.IGNORECASE),
+    "estimate_works": re.compile(
+        rf"^\s*Итого\s+(?:по\s+)?работ\w*[^\d\n]*{_LABELED_AMOUNT}", re.IGNORECASE | re.MULTILINE
+    ),
+    # Только итог по расходным материалам: общий итог по материалам включает С3
+    "estimate_supplies": re.compile(
+        rf"^\s*Итого\s+(?:по\s+)?расходн\w*\s+материал\w*[^\d\n]*{_LABELED_AMOUNT}",
+        re.IGNORECASE | re.MULTILINE,
+    ),
+    "estimate_overhead": re.compile(
+        rf"^\s*(?:Итого\s+)?накладн\w*\s+расход\w*[^\d\n]*{_LABELED_AMOUNT}", re.IGNORECASE | re.MULTILINE
+    ),
+    "estimate_transport": re.compile(
+        rf"^\s*(?:Итого\s+)?транспортн\w*\s+расход\w*[^\d\n]*{_LABELED_AMOUNT}", re.IGNORECASE | re.MULTILINE
+    ),
+}
+
+# Даты в формате ДД.ММ.ГГГГ — так же их принимает обработчик карточки
+_LABELED_DATE_PATTERNS = {
+    "start_date": re.compile(
+        rf"(?:Дата\s+начала(?:\s+работ)?|Начало\s+работ)[^\d\n]*({_DATE})", re.IGNORECASE
+    ),
+    "end_date": re.compile(
+        rf"(?:Дата\s+(?:окончания|завершения)(?:\s+работ)?|Окончание\s+работ)[^\d\n]*({_DATE})", re.IGNORECASE
+    ),
+}
+
+# «Сроки выполнения: с 01.11.2025 по 30.11.2025»
+_PERIOD_RE = re.compile(rf"Срок\w*[^\d\n]*({_DATE})\s*(?:по|—|–|-)\s*({_DATE})", re.IGNORECASE)
+
+# Поля, которые LLM должна вернуть, если их не удалось найти локально
+_OBJECT_SCHEMA_HINT = {
+    "name": "string | null",
+    "address": "string | null",
+    "foreman_name": "string | null",
+    "start_date": "YYYY-MM-DD | null",
+    "end_date": "YYYY-MM-DD | null",
+    "prepayment": "number | null",
+    "final_payment": "number | null",
+    "estimate_s3": "number | null",
+    "actual_s3_discount": "number | null",
+    "estimate_works": "number | null",
+    "estimate_supplies": "number | null",
+    "estimate_overhead": "number | null",
+    "estimate_transport": "number | null",
+}
+
+
+# Без этих полей карточку нельзя сохранить без ручного ввода; если они найдены
+# локально, запрос к LLM не нужен. Остальные поля (даты, адрес, бригадир,
+# actual_s3_discount) пользователь может дописать сообщением при подтверждении
+_REQUIRED_FIELDS = (
+    "name",
+    "prepayment",
+    "final_payment",
+    "estimate_s3",
+    "estimate_works",
+    "estimate_supplies",
+    "estimate_overhead",
+    "estimate_transport",
+)
+
+
+def _parse_amount(raw: str) -> Optional[Decimal]:
+    cleaned = raw.replace(" ", "").replace("\u00a0", "").replace(",", ".")
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+
+def _regex_extract(text: str) -> Dict[str, Any]:
+    """Извлекает поля сметы по стандартному шаблону без обращения к LLM.
+
+    Поля, которые не удалось найти, возвращаются как None.
+    """
+
+    data: Dict[str, Any] = {field: None for field in _OBJECT_SCHEMA_HINT}
+
+    for field, pattern in _LABELED_TEXT_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            data[field] = match.group(1)
+
+    for field, pattern in _LABELED_AMOUNT_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            data[field] = _parse_amount(match.group(1))
+
+    for field, pattern in _LABELED_DATE_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            data[field] = match.group(1)
+
+    if data["start_date"] is None and data["end_date"] is None:
+        match = _PERIOD_RE.search(text)
+        if match:
+            data["start_date"], data["end_date"] = match.group(1), match.group(2)
+
+    c3_items: list[str] = []
+    c3_total = Decimal(0)
+    for line in text.splitlines():
+        normalized = line.lower().translate(_QUOTES_TRANSLATION).replace("c3", "с3")
+        if not any(marker in normalized for marker in _C3_MARKERS):
+            continue
+        amounts = _AMOUNT_RE.findall(line)
+        if not amounts:
+            continue
+        amount = _parse_amount(amounts[-1])
+        if amount is None:
+            continue
+        c3_items.append(line.strip())
+        c3_total += amount
+
+    if c3_items:
+        data["estimate_s3"] = c3_total
+        data["c3_items"] = c3_items
+
+    return data
+
+
 async def extract_text_from_pdf(file_path: str) -> str:
     """Извлекает текст из PDF-файла в неблокирующем режиме."""
 
@@ -27,7 +199,20 @@ async def extract_text_from_pdf(file_path: str) -> str:
 
 
 async def parse_pdf_to_object_data(text: str) -> Dict[str, Any]:
-    """Отправляет извлечённый текст сметы в LLM и возвращает структуру данных объекта."""
+    """Извлекает структуру данных объекта из текста сметы.
+
+    Сначала поля ищутся регулярными выражениями по стандартному шаблону.
+    Если найдены все обязательные поля, LLM не вызывается; иначе в LLM
+    отправляется запрос только на недостающие поля.
+    """
+
+    prefilled = _regex_extract(text)
+    found = {key: value for key, value in prefilled.items() if value is not None}
+
+    if all(prefilled.get(field) is not None for field in _REQUIRED_FIELDS):
+        return found
+
+    missing_fields = [field for field in _OBJECT_SCHEMA_HINT if prefilled.get(field) is None]
 
     system_prompt = (
         "Ты помогаешь заполнить карточку строительного объекта по содержанию сметы. "
@@ -49,27 +234,15 @@ async def parse_pdf_to_object_data(text: str) -> Dict[str, Any]:
         "Текст сметы:\n" + text
     )
 
-    schema_hint = {
-        "name": "string | null",
-        "address": "string | null",
-        "foreman_name": "string | null",
-        "start_date": "YYYY-MM-DD | null",
-        "end_date": "YYYY-MM-DD | null",
-        "prepayment": "number | null",
-        "final_payment": "number | null",
-        "estimate_s3": "number | null",
-        "actual_s3_discount": "number | null",
-        "estimate_works": "number | null",
-        "estimate_supplies": "number | null",
-        "estimate_overhead": "number | null",
-        "estimate_transport": "number | null",
-        "c3_items": "array of strings",
-        "supplies_items": "array of strings"
-    }
+    schema_hint: Dict[str, str] = {field: _OBJECT_SCHEMA_HINT[field] for field in missing_fields}
+    if "estimate_s3" in schema_hint:
+        schema_hint["c3_items"] = "array of strings"
+    if "estimate_supplies" in schema_hint:
+        schema_hint["supplies_items"] = "array of strings"
 
     format_instructions = (
-        "Верни только JSON без комментариев и пояснений. Пример структуры:\n"
-        f"{json.dumps(schema_hint, ensure_ascii=False)}"
+        "Верни только JSON без комментариев и пояснений, только с этими полями. Пример структуры:\n"
+        f"{_dumps(schema_hint)}"
     )
 
     response = await _openai_client.chat.completions.create(
@@ -91,17 +264,20 @@ async def parse_pdf_to_object_data(text: str) -> Dict[str, Any]:
             content = content[len("json"):]
 
     try:
-        data = json.loads(content)
+        data = _loads(content)
     except json.JSONDecodeError:
-        return {}
+        return found
 
-    return data
+    if not isinstance(data, dict):
+        return found
+
+    return {**data, **found}
 
 
 async def parse_object_correction(message: str, current_data: Dict[str, Any]) -> Dict[str, Any]:
     """Определяет, какое поле объекта нужно изменить на основании пользовательского сообщения."""
 
-    context = json.dumps(current_data, ensure_ascii=False)
+    context = _dumps(current_data)
     prompt = (
         "Пользователь просит изменить данные карточки строительного объекта. "
         "Нужно определить поле и новое значение. Если запрос не про карточку, верни пустой JSON.\n"
@@ -139,7 +315,7 @@ async def parse_object_correction(message: str, current_data: Dict[str, Any]) ->
             raw = raw[len("json"):]
 
     try:
-        parsed = json.loads(raw)
+        parsed = _loads(raw)
     except json.JSONDecodeError:
         return {}
 
@@ -2,11 +2,125 @@
 Генератор отчетов по объектам
 """
 from datetime import datetime
-from decimal import Decimal
-from typing import List, Optional
+from decimal import Decimal, localcontext
+from functools import lru_cache
+from typing import Dict, List, Optional
 
-from database.models import ConstructionObject, File, FileType
-from bot.services.calculations import calculate_profit_data, format_currency, format_percentage
+from database.models import ConstructionObject, ExpenseType, FileType, ObjectStatus
+from bot.services.calculations import (
+    MONEY_CONTEXT,
+    calculate_profit_data,
+    calculate_profit_data_from_totals,
+    format_currency,
+    format_percentage,
+)
+
+
+_SEPARATOR = "━" * 19
+_WIDE_SEPARATOR = "━" * 38
+
+_STATUS_MAP = {
+    ObjectStatus.ACTIVE: ("🟢", "Текущий"),
+    ObjectStatus.COMPLETED: ("✅", "Завершенный"),
+}
+
+# Неизменный каркас отчета по объекту; значения подставляются через format_map
+_OBJECT_REPORT_TEMPLATE = "\n".join([
+    "🏗 ОБЪЕКТ: {name}",
+    "📍 Адрес: {address}",
+    "👷 Бригадир: {foreman_name}",
+    "📅 Период: {start_date} — {end_date}",
+    "",
+    _SEPARATOR,
+    "",
+    "💸 ФИНАНСЫ",
+    "",
+    "Предоплата: {prepayment}",
+    "Окончательная оплата: {final_payment}",
+    "💰 Всего поступлений: {total_income}",
+    "",
+    _SEPARATOR,
+    "",
+    "🧱 ОБЛИЦОВКА С3",
+    "",
+    "По смете: {estimate_s3}",
+    "Со скидкой: {actual_s3_discount}",
+    "Разница: {s3_difference}",
+    "",
+    _SEPARATOR,
+    "",
+    "⚒️ РАБОТЫ",
+    "",
+    "По смете: {estimate_works}",
+    "ФЗП мастера (45 %): {fzp_master}",
+    "ФЗП бригадира (10 %): {fzp_foreman}",
+    "Выдано на данный момент: {total_advances}",
+    "Прибыль фирмы: {work_profit}",
+    "",
+    _SEPARATOR,
+    "",
+    "🧰 РАСХОДНИКИ",
+    "",
+    "По смете: {estimate_supplies}",
+    "Потрачено по факту: {supplies_fact}",
+    "Разница: {supplies_difference}",
+    "",
+    _SEPARATOR,
+    "",
+    "💰 НАКЛАДНЫЕ РАСХОДЫ",
+    "",
+    "По смете: {estimate_overhead}",
+    "Потрачено по факту: {overhead_fact}",
+    "Разница: {overhead_difference}",
+    "",
+    _SEPARATOR,
+    "",
+    "🚚 ТРАНСПОРТНЫЕ УСЛУГИ",
+    "",
+    "По смете: {estimate_transport}",
+    "Потрачено по факту: {transport_fact}",
+    "Разница: {transport_difference}",
+    "",
+    _SEPARATOR,
+    "",
+    "📊 ИТОГОВЫЕ ПОКАЗАТЕЛИ",
+    "",
+    "Общие доходы: {total_income}",
+    "💰 Прибыль: {total_profit}",
+    "📈 Рентабельность: {profitability}",
+])
+
+# Шапка сводного отчета за период
+_PERIOD_REPORT_HEADER_TEMPLATE = """
+📊 СВОДНЫЙ ОТЧЕТ ЗА {period}
+{sep}
+
+📈 Общие показатели:
+Количество объектов: {objects_count}
+Общий доход: {total_income}
+Расходы фирмы: {company_total}
+Общая прибыль: {adjusted_profit}
+Средняя рентабельность: {avg_profitability}
+
+{sep}
+
+🏢 Расходы фирмы:
+   • Разовые: {company_one_time}
+   • Ежемесячные: {company_recurring}
+
+{sep}
+
+📋 Список объектов:
+"""
+
+
+@lru_cache(maxsize=2048)
+def _fmt_date(value: Optional[datetime]) -> str:
+    return value.strftime("%d.%m.%Y") if value else "—"
+
+
+def _to_kopecks(value: Decimal) -> int:
+    return int(value.scaleb(2).to_integral_value())
 
 
 def _currency(value: Decimal) -> str:
@@ -35,115 +149,92 @@ def _format_positive(value: Decimal) -> str:
 
 def generate_object_report(
     obj: ConstructionObject,
-    files: List[File] = None,
+    file_counts: Optional[Dict[FileType, int]] = None,
     bot_username: Optional[str] = None,
+    total_advances_amount: Optional[Decimal] = None,
+    expense_totals: Optional[Dict[ExpenseType, Decimal]] = None,
 ) -> str:
     """
     Генерация текстового отчета по объекту
     
     Args:
-        obj: Объект строительства с загруженными расходами и авансами
-        files: Список файлов объекта
+        obj: Объект строительства с загруженными расходами
+        file_counts: Количество файлов объекта по типам
+        bot_username: Username бота для ссылки на документы
+        total_advances_amount: Сумма выданных авансов (посчитанная в БД);
+            если не передана, считается по загруженным obj.advances
+        expense_totals: Суммы расходов по типам (посчитанные в БД);
+            если не переданы, считаются по загруженным obj.expenses
         
     Returns:
         Отформатированный текст отчета
     """
     
     # Рассчитываем все показатели
-    data = calculate_profit_data(obj)
-    total_advances_amount = sum(
-        (advance.amount for advance in getattr(obj, "advances", [])),
-        Decimal(0)
-    )
+    if expense_totals is not None:
+        data = calculate_profit_data_from_totals(obj, expense_totals)
+    else:
+        data = calculate_profit_data(obj)
+    if total_advances_amount is None:
+        total_advances_amount = sum(
+            (advance.amount for advance in getattr(obj, "advances", [])),
+            Decimal(0)
+        )
     
     # Форматируем даты
-    start_date = obj.start_date.strftime("%d.%m.%Y") if obj.start_date else "—"
-    end_date = obj.end_date.strftime("%d.%m.%Y") if obj.end_date else "—"
+    start_date = _fmt_date(obj.start_date)
+    end_date = _fmt_date(obj.end_date)
     
     # Формируем отчет
-    lines = [
-        f"🏗 ОБЪЕКТ: {obj.name}",
-        f"📍 Адрес: {obj.address or '—'}",
-        f"👷 Бригадир: {obj.foreman_name or '—'}",
-        f"📅 Период: {start_date} — {end_date}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "💸 ФИНАНСЫ",
-        "",
-        f"Предоплата: {_currency(data['prepayment'])}",
-        f"Окончательная оплата: {_currency(data['final_payment'])}",
-        f"💰 Всего поступлений: {_currency(data['total_income'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "🧱 ОБЛИЦОВКА С3",
-        "",
-        f"По смете: {_currency(data['estimate_s3'])}",
-        f"Со скидкой: {_currency(data['actual_s3_discount'])}",
-        f"Разница: {_format_delta(data['s3_difference'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "⚒️ РАБОТЫ",
-        "",
-        f"По смете: {_currency(data['estimate_works'])}",
-        f"ФЗП мастера (45 %): {_currency(data['fzp_master'])}",
-        f"ФЗП бригадира (10 %): {_currency(data['fzp_foreman'])}",
-        f"Выдано на данный момент: {_currency(total_advances_amount)}",
-        f"Прибыль фирмы: {_format_positive(data['work_profit'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "🧰 РАСХОДНИКИ",
-        "",
-        f"По смете: {_currency(data['estimate_supplies'])}",
-        f"Потрачено по факту: {_currency(data['supplies_fact'])}",
-        f"Разница: {_format_delta(data['supplies_difference'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "💰 НАКЛАДНЫЕ РАСХОДЫ",
-        "",
-        f"По смете: {_currency(data['estimate_overhead'])}",
-        f"Потрачено по факту: {_currency(data['overhead_fact'])}",
-        f"Разница: {_format_delta(data['overhead_difference'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "🚚 ТРАНСПОРТНЫЕ УСЛУГИ",
-        "",
-        f"По смете: {_currency(data['estimate_transport'])}",
-        f"Потрачено по факту: {_currency(data['transport_fact'])}",
-        f"Разница: {_format_delta(data['transport_difference'])}",
-        "",
-        "━━━━━━━━━━━━━━━━━━━",
-        "",
-        "📊 ИТОГОВЫЕ ПОКАЗАТЕЛИ",
-        "",
-        f"Общие доходы: {_currency(data['total_income'])}",
-        f"💰 Прибыль: {_format_positive(data['total_profit'])}",
-        f"📈 Рентабельность: {_percentage(data['profitability'])}",
-    ]
-
-    attachments = files or []
-    receipts = [f for f in attachments if f.file_type == FileType.RECEIPT]
-    docs = [f for f in attachments if f.file_type == FileType.DOCUMENT]
-    photos = [f for f in attachments if f.file_type == FileType.PHOTO]
-    estimates = [f for f in attachments if f.file_type == FileType.ESTIMATE]
-    payrolls = [f for f in attachments if f.file_type == FileType.PAYROLL]
+    report = _OBJECT_REPORT_TEMPLATE.format_map({
+        "name": obj.name,
+        "address": obj.address or "—",
+        "foreman_name": obj.foreman_name or "—",
+        "start_date": start_date,
+        "end_date": end_date,
+        "prepayment": _currency(data['prepayment']),
+        "final_payment": _currency(data['final_payment']),
+        "total_income": _currency(data['total_income']),
+        "estimate_s3": _currency(data['estimate_s3']),
+        "actual_s3_discount": _currency(data['actual_s3_discount']),
+        "s3_difference": _format_delta(data['s3_difference']),
+        "estimate_works": _currency(data['estimate_works']),
+        "fzp_master": _currency(data['fzp_master']),
+        "fzp_foreman": _currency(data['fzp_foreman']),
+        "total_advances": _currency(total_advances_amount),
+        "work_profit": _format_positive(data['work_profit']),
+        "estimate_supplies": _currency(data['estimate_supplies']),
+        "supplies_fact": _currency(data['supplies_fact']),
+        "supplies_difference": _format_delta(data['supplies_difference']),
+        "estimate_overhead": _currency(data['estimate_overhead']),
+        "overhead_fact": _currency(data['overhead_fact']),
+        "overhead_difference": _format_delta(data['overhead_difference']),
+        "estimate_transport": _currency(data['estimate_transport']),
+        "transport_fact": _currency(data['transport_fact']),
+        "transport_difference": _format_delta(data['transport_difference']),
+        "total_profit": _format_positive(data['total_profit']),
+        "profitability": _percentage(data['profitability']),
+    })
+    lines = [report]
+
+    counts = file_counts or {}
+    receipts = counts.get(FileType.RECEIPT, 0)
+    docs = counts.get(FileType.DOCUMENT, 0)
+    photos = counts.get(FileType.PHOTO, 0)
+    estimates = counts.get(FileType.ESTIMATE, 0)
+    payrolls = counts.get(FileType.PAYROLL, 0)
 
     attachment_lines: list[str] = []
     if estimates:
-        attachment_lines.append(f"📑 Сметы (PDF): {len(estimates)} шт.")
+        attachment_lines.append(f"📑 Сметы (PDF): {estimates} шт.")
     if payrolls:
-        attachment_lines.append(f"👷‍♂️ ФЗП (PDF): {len(payrolls)} шт.")
+        attachment_lines.append(f"👷‍♂️ ФЗП (PDF): {payrolls} шт.")
     if receipts:
-        attachment_lines.append(f"🧾 Чеки: {len(receipts)} шт.")
+        attachment_lines.append(f"🧾 Чеки: {receipts} шт.")
     if docs:
-        attachment_lines.append(f"📄 Документы: {len(docs)} шт.")
+        attachment_lines.append(f"📄 Документы: {docs} шт.")
     if photos:
-        attachment_lines.append(f"📷 Фото: {len(photos)} шт.")
+        attachment_lines.append(f"📷 Фото: {photos} шт.")
 
     attachments_header = "📎 ПРИЛОЖЕНИЯ"
     if bot_username:
@@ -152,7 +243,7 @@ def generate_object_report(
     if attachment_lines or bot_username:
         lines.extend([
             "",
-            "━━━━━━━━━━━━━━━━━━━",
+            _SEPARATOR,
             "",
             attachments_header,
         ])
@@ -179,12 +270,11 @@ def generate_short_object_card(obj: ConstructionObject) -> str:
     """
     
     # Статус
-    status_emoji = "🟢" if obj.status.value == "active" else "✅"
-    status_text = "Текущий" if obj.status.value == "active" else "Завершенный"
+    status_emoji, status_text = _STATUS_MAP.get(obj.status, ("✅", "Завершенный"))
     
     # Даты
-    start_date = obj.start_date.strftime("%d.%m.%Y") if obj.start_date else "—"
-    end_date = obj.end_date.strftime("%d.%m.%Y") if obj.end_date else "—"
+    start_date = _fmt_date(obj.start_date)
+    end_date = _fmt_date(obj.end_date)
     
     card = f"""
 {status_emoji} {obj.name}
@@ -202,6 +292,7 @@ def generate_period_report(
     objects: List[ConstructionObject],
     period_str: str,
     company_expenses: Optional[dict] = None,
+    expense_totals: Optional[Dict[int, Dict[ExpenseType, Decimal]]] = None,
 ) -> str:
     """
     Генерация сводного отчета за период
@@ -209,6 +300,9 @@ def generate_period_report(
     Args:
         objects: Список объектов за период
         period_str: Строка с описанием периода
+        company_expenses: Расходы фирмы за период
+        expense_totals: Суммы расходов по типам для каждого объекта
+            (посчитанные в БД); если не переданы, используются obj.expenses
         
     Returns:
         Сводный отчет
@@ -219,53 +313,60 @@ def generate_period_report(
     if not objects and company_data["total"] == 0:
         return f"📊 Отчет за {period_str}\n\nНет данных за указанный период."
     
-    # Считаем агрегированные показатели
-    total_income = Decimal(0)
-    total_profit = Decimal(0)
-    
-    for obj in objects:
-        data = calculate_profit_data(obj)
-        total_income += data['total_income']
-        total_profit += data['total_profit']
-    
+    # Показатели каждого объекта считаем один раз: они нужны и для итогов, и для списка
+    if expense_totals is not None:
+        profit_data = {
+            obj.id: calculate_profit_data_from_totals(obj, expense_totals.get(obj.id, {}))
+            for obj in objects
+        }
+    else:
+        profit_data = {obj.id: calculate_profit_data(obj) for obj in objects}
+
     company_total = company_data.get("total", Decimal(0))
     company_one_time = company_data.get("one_time", Decimal(0))
     company_recurring = company_data.get("recurring", Decimal(0))
 
-    adjusted_profit = total_profit - company_total
-
-    avg_profitability = (adjusted_profit / total_income * 100) if total_income > 0 else Decimal(0)
+    # Считаем агрегированные показатели. Доход точен до копейки, поэтому
+    # суммируется целыми копейками; прибыль содержит доли копейки (ФЗП 0.45/0.10)
+    # и суммируется точно — округление по объектам изменило бы итог
+    total_income_kopecks = 0
     
-    report = f"""
-📊 СВОДНЫЙ ОТЧЕТ ЗА {period_str.upper()}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-📈 Общие показатели:
-Количество объектов: {len(objects)}
-Общий доход: {format_currency(total_income)}
-Расходы фирмы: {format_currency(company_total)}
-Общая прибыль: {format_currency(adjusted_profit)}
-Средняя рентабельность: {format_percentage(avg_profitability)}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    with localcontext(MONEY_CONTEXT):
+        total_profit = Decimal(0)
+        
+        for obj in objects:
+            data = profit_data[obj.id]
+            total_income_kopecks += _to_kopecks(data['total_income'])
+            total_profit += data['total_profit']
 
-🏢 Расходы фирмы:
-   • Разовые: {format_currency(company_one_time)}
-   • Ежемесячные: {format_currency(company_recurring)}
+        total_income = Decimal(total_income_kopecks).scaleb(-2)
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+        adjusted_profit = total_profit - company_total
 
-📋 Список объектов:
-"""
+        avg_profitability = (adjusted_profit / total_income * 100) if total_income > 0 else Decimal(0)
+    
+    header = _PERIOD_REPORT_HEADER_TEMPLATE.format_map({
+        "period": period_str.upper(),
+        "sep": _WIDE_SEPARATOR,
+        "objects_count": len(objects),
+        "total_income": format_currency(total_income),
+        "company_total": format_currency(company_total),
+        "adjusted_profit": format_currency(adjusted_profit),
+        "avg_profitability": format_percentage(avg_profitability),
+        "company_one_time": format_currency(company_one_time),
+        "company_recurring": format_currency(company_recurring),
+    })
 
+    parts = [header]
     if objects:
-        for i, obj in enumerate(objects, 1):
-            data = calculate_profit_data(obj)
-            report += f"\n{i}. {obj.name}\n"
-            report += f"   💰 Прибыль: {format_currency(data['total_profit'])}\n"
-            report += f"   📈 Рентабельность: {format_percentage(data['profitability'])}\n"
+        parts.extend(
+            f"\n{i}. {obj.name}\n"
+            f"   💰 Прибыль: {format_currency(profit_data[obj.id]['total_profit'])}\n"
+            f"   📈 Рентабельность: {format_percentage(profit_data[obj.id]['profitability'])}\n"
+            for i, obj in enumerate(objects, 1)
+        )
     else:
-        report += "\nНет объектов за период."
+        parts.append("\nНет объектов за период.")
     
-    return report.strip()
+    return "".join(parts).strip()
 
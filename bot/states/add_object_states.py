@@ -33,3 +33,8 @@ class AddObjectStates(StatesGroup):
     confirm_object = State()
 
 
+# Строковые ключи состояний, вычисленные один раз: State.state собирает
+# строку "группа:имя" при каждом обращении
+ENTER_ADDRESS_STATE = AddObjectStates.enter_address.state
+ENTER_FOREMAN_STATE = AddObjectStates.enter_foreman.state
+ENTER_DATES_STATE = AddObjectStates.enter_dates.state
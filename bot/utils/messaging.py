@@ -1,11 +1,17 @@
 """Utility helpers for managing callback replies and bot metadata."""
 import contextlib
 from typing import Any, Optional
+from weakref import WeakKeyDictionary
 
 from aiogram import Bot
 from aiogram.types import CallbackQuery, Message
 
 
+# Username бота не меняется за время работы процесса; слабые ссылки
+# не удерживают объект Bot после его закрытия
+_username_cache: "WeakKeyDictionary[Bot, str]" = WeakKeyDictionary()
+
+
 async def delete_message(message: Message) -> None:
     with contextlib.suppress(Exception):
         await message.delete()
@@ -21,22 +27,20 @@ async def send_new_message(
 
 
 async def get_bot_username(bot: Bot | None) -> Optional[str]:
-    """Безопасно получить username бота (кешируется в объекте Bot)."""
+    """Безопасно получить username бота (кешируется для каждого Bot)."""
 
     if not bot:
         return None
 
-    cached = getattr(bot, "_cached_username", None)
+    cached = _username_cache.get(bot)
     if cached is not None:
         return cached
 
     try:
         me = await bot.get_me()
     except Exception:
-        username: Optional[str] = None
-    else:
-        username = me.username
-
-    setattr(bot, "_cached_username", username)
-    return username
+        return None
 
+    if me.username:
+        _username_cache[bot] = me.username
+    return me.username
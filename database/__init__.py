@@ -5,7 +5,7 @@ from database.models import (
     ObjectLog, ObjectLogType,
     CompanyExpense, CompanyRecurringExpense, CompanyExpenseLog
 )
-from database.database import engine, async_session_maker, get_session, init_db, close_db
+from database.database import engine, async_session_maker, get_session, session_dep, init_db, close_db
 from database import crud
 
 __all__ = [
@@ -13,7 +13,7 @@ __all__ = [
     "Expense", "ExpenseType", "Advance", "File", "FileType",
     "ObjectLog", "ObjectLogType",
     "CompanyExpense", "CompanyRecurringExpense", "CompanyExpenseLog",
-    "engine", "async_session_maker", "get_session", "init_db", "close_db",
+    "engine", "async_session_maker", "get_session", "session_dep", "init_db", "close_db",
     "crud"
 ]
 
@@ -1,15 +1,19 @@
 """
 CRUD операции для работы с базой данных
+
+Функции не фиксируют транзакцию: изменения одного обработчика
+коммитятся вместе (см. DatabaseMiddleware в bot/main.py).
 """
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, BinaryIO
 from enum import Enum
 from datetime import datetime
 from decimal import Decimal
 import logging
-from sqlalchemy import select, update, delete, and_, or_, func, text
+import time
+from sqlalchemy import select, insert, update, delete, and_, or_, func, union, bindparam, tuple_, cast, literal, literal_column, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import selectinload, joinedload, raiseload, undefer_group, make_transient_to_detached
 
 from database.models import (
     User, UserRole, ConstructionObject, ObjectStatus,
@@ -29,14 +33,93 @@ class DeleteUserResult(Enum):
 logger = logging.getLogger(__name__)
 
 
+# ============ REQUEST CACHE ============
+
+# Кеш выборок в пределах обработки одного апдейта Telegram: middleware
+# авторизации и сам обработчик часто запрашивают одни и те же строки.
+# Хранится в session.info, поэтому закешированные объекты всегда
+# принадлежат той же сессии, что и запрос.
+_REQUEST_CACHE_KEY = "req_cache"
+
+
+def start_request_cache(session: AsyncSession) -> None:
+    """Открыть кеш выборок на время обработки одного апдейта"""
+    session.info[_REQUEST_CACHE_KEY] = {}
+
+
+def _cache_get(session: AsyncSession, key: tuple):
+    cache = session.info.get(_REQUEST_CACHE_KEY)
+    return cache.get(key) if cache is not None else None
+
+
+def _cache_set(session: AsyncSession, key: tuple, value) -> None:
+    cache = session.info.get(_REQUEST_CACHE_KEY)
+    if cache is not None and value is not None:
+        cache[key] = value
+
+
+def _cache_drop(session: AsyncSession, key: tuple) -> None:
+    cache = session.info.get(_REQUEST_CACHE_KEY)
+    if cache is not None:
+        cache.pop(key, None)
+
+
+# ============ USER CACHE ============
+
+# Пользователь нужен каждому апдейту (AuthMiddleware), а меняется редко.
+# Между апдейтами храним снимок значений колонок, а не ORM-объект: объект
+# принадлежит чужой сессии и может быть изменён в ней. При попадании снимок
+# прикрепляется к текущей сессии через merge(load=False) — без запроса к БД.
+# Блокировка не нужна: между чтением и записью словаря нет await.
+USER_CACHE_TTL = 30.0
+_user_cache: dict[int, tuple[float, dict]] = {}
+_USER_COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+def _user_cache_get(telegram_id: int) -> Optional[dict]:
+    entry = _user_cache.get(telegram_id)
+    if entry is None:
+        return None
+    expires_at, values = entry
+    if expires_at < time.monotonic():
+        _user_cache.pop(telegram_id, None)
+        return None
+    return values
+
+
+def _user_cache_set(user: User) -> None:
+    values = {key: getattr(user, key) for key in _USER_COLUMNS}
+    _user_cache[user.telegram_id] = (time.monotonic() + USER_CACHE_TTL, values)
+
+
+def invalidate_user_cache(telegram_id: int) -> None:
+    """Сбросить закешированного пользователя (после изменения роли/статуса)"""
+    _user_cache.pop(telegram_id, None)
+
+
 # ============ USER CRUD ============
 
+_USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam("telegram_id"))
+
+
 async def get_user_by_telegram_id(session: AsyncSession, telegram_id: int) -> Optional[User]:
     """Получить пользователя по telegram_id"""
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    return result.scalar_one_or_none()
+    cached = _cache_get(session, ("user", telegram_id))
+    if cached is not None:
+        return cached
+
+    values = _user_cache_get(telegram_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        user = await session.merge(user, load=False)
+    else:
+        result = await session.execute(_USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
+        user = result.scalar_one_or_none()
+        if user is not None:
+            _user_cache_set(user)
+    _cache_set(session, ("user", telegram_id), user)
+    return user
 
 
 async def create_user(
@@ -47,41 +130,138 @@ async def create_user(
     full_name: Optional[str] = None
 ) -> User:
     """Создать нового пользователя"""
-    user = User(
-        telegram_id=telegram_id,
-        username=username,
-        full_name=full_name,
-        role=role,
-        is_active=True
-    )
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    result = await session.execute(
+        insert(User)
+        .values(
+            telegram_id=telegram_id,
+            username=username,
+            full_name=full_name,
+            role=role,
+            is_active=True
+        )
+        .returning(User)
+    )
+    user = result.scalar_one()
     return user
 
 
+async def get_or_create_user(
+    session: AsyncSession,
+    telegram_id: int,
+    defaults: dict,
+    update_fields: tuple[str, ...] = ()
+) -> tuple[User, bool]:
+    """
+    Получить или создать пользователя одним INSERT ... ON CONFLICT
+    
+    Args:
+        defaults: Значения полей User для нового пользователя
+        update_fields: Поля из defaults, которые нужно перезаписать у существующего
+    
+    Returns:
+        (пользователь, True если он только что создан)
+    """
+    stmt = pg_insert(User).values(telegram_id=telegram_id, is_active=True, **defaults)
+    # DO UPDATE нужен и без изменений: DO NOTHING не вернёт существующую строку
+    set_ = {name: stmt.excluded[name] for name in update_fields} or {"telegram_id": stmt.excluded.telegram_id}
+    stmt = (
+        stmt.on_conflict_do_update(index_elements=[User.telegram_id], set_=set_)
+        # xmax = 0 только у строки, вставленной этим запросом
+        .returning(User, literal_column("xmax = 0").label("inserted"))
+        .execution_options(populate_existing=True)
+    )
+    result = await session.execute(stmt)
+    user, inserted = result.one()
+    invalidate_user_cache(telegram_id)
+    _cache_set(session, ("user", telegram_id), user)
+    return user, inserted
+
+
 async def update_user_active_status(
     session: AsyncSession,
     telegram_id: int,
     is_active: bool
 ) -> Optional[User]:
     """Обновить статус активности пользователя"""
+    cached = _cache_get(session, ("user", telegram_id))
+    if cached is not None:
+        return update_user_active_status_obj(cached, is_active)
+
+    invalidate_user_cache(telegram_id)
     result = await session.execute(
         update(User)
         .where(User.telegram_id == telegram_id)
         .values(is_active=is_active)
         .returning(User)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
-async def get_all_users(session: AsyncSession) -> List[User]:
-    """Получить всех пользователей"""
-    result = await session.execute(select(User).order_by(User.created_at.desc()))
+async def update_user_active_status_light(
+    session: AsyncSession,
+    telegram_id: int,
+    is_active: bool
+) -> bool:
+    """
+    Обновить статус активности пользователя без загрузки строки
+    
+    Для вызывающих, которым нужен только факт обновления.
+    
+    Returns:
+        True, если пользователь найден
+    """
+    cached = _cache_get(session, ("user", telegram_id))
+    if cached is not None:
+        update_user_active_status_obj(cached, is_active)
+        return True
+
+    invalidate_user_cache(telegram_id)
+    result = await session.execute(
+        update(User)
+        .where(User.telegram_id == telegram_id)
+        .values(is_active=is_active)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+def update_user_active_status_obj(user: User, is_active: bool) -> User:
+    """
+    Обновить статус активности уже загруженного пользователя
+
+    Изменение записывается в БД при сбросе сессии (коммит в конце обработки апдейта).
+    """
+    user.is_active = is_active
+    invalidate_user_cache(user.telegram_id)
+    return user
+
+
+async def get_all_users(
+    session: AsyncSession,
+    cursor: Optional[tuple[datetime, int]] = None,
+    limit: int = 50
+) -> List[User]:
+    """
+    Получить страницу пользователей (новые первыми)
+    
+    Args:
+        cursor: (created_at, id) последнего пользователя предыдущей страницы
+        limit: Размер страницы
+    """
+    query = select(User).order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+    if cursor is not None:
+        query = query.where(tuple_(User.created_at, User.id) < tuple_(*cursor))
+    result = await session.execute(query)
     return list(result.scalars().all())
 
 
+async def count_users(session: AsyncSession) -> int:
+    """Получить количество пользователей"""
+    result = await session.execute(select(func.count(User.id)))
+    return result.scalar_one()
+
+
 async def delete_user(session: AsyncSession, telegram_id: int) -> DeleteUserResult:
     """Удалить пользователя. Если у пользователя есть связанные данные, он деактивируется."""
 
@@ -89,6 +269,8 @@ async def delete_user(session: AsyncSession, telegram_id: int) -> DeleteUserResu
     if not user:
         return DeleteUserResult.NOT_FOUND
 
+    _cache_drop(session, ("user", telegram_id))
+    invalidate_user_cache(telegram_id)
     user_id = user.id
 
     dependency_checks = [
@@ -114,13 +296,11 @@ async def delete_user(session: AsyncSession, telegram_id: int) -> DeleteUserResu
             .where(User.id == user_id)
             .values(is_active=False)
         )
-        await session.commit()
         return DeleteUserResult.DEACTIVATED
 
     await session.execute(
         delete(User).where(User.id == user_id)
     )
-    await session.commit()
     return DeleteUserResult.DELETED
 
 
@@ -144,47 +324,76 @@ async def create_object(
     actual_s3_discount: Decimal = Decimal(0),
 ) -> ConstructionObject:
     """Создать новый строительный объект"""
-    obj = ConstructionObject(
-        name=name,
-        address=address,
-        foreman_name=foreman_name,
-        start_date=start_date,
-        end_date=end_date,
-        prepayment=prepayment,
-        final_payment=final_payment,
-        estimate_s3=estimate_s3,
-        estimate_works=estimate_works,
-        estimate_supplies=estimate_supplies,
-        estimate_overhead=estimate_overhead,
-        estimate_transport=estimate_transport,
-        actual_s3_discount=actual_s3_discount,
-        created_by=created_by,
-        status=ObjectStatus.ACTIVE
-    )
-    session.add(obj)
-    await session.commit()
-    await session.refresh(obj)
+    result = await session.execute(
+        insert(ConstructionObject)
+        .values(
+            name=name,
+            address=address,
+            foreman_name=foreman_name,
+            start_date=start_date,
+            end_date=end_date,
+            prepayment=prepayment,
+            final_payment=final_payment,
+            estimate_s3=estimate_s3,
+            estimate_works=estimate_works,
+            estimate_supplies=estimate_supplies,
+            estimate_overhead=estimate_overhead,
+            estimate_transport=estimate_transport,
+            actual_s3_discount=actual_s3_discount,
+            created_by=created_by,
+            status=ObjectStatus.ACTIVE
+        )
+        .returning(ConstructionObject)
+    )
+    obj = result.scalar_one()
     return obj
 
 
+_OBJECT_BY_ID = select(ConstructionObject).where(ConstructionObject.id == bindparam("object_id"))
+
+# Связи объекта, которые можно запросить в get_object_by_id(loads=...)
+_OBJECT_LOADS = {
+    "creator": lambda: joinedload(ConstructionObject.creator),
+    "expenses": lambda: selectinload(ConstructionObject.expenses),
+    "advances": lambda: selectinload(ConstructionObject.advances),
+    "files": lambda: selectinload(ConstructionObject.files),
+    "logs": lambda: selectinload(ConstructionObject.logs),
+}
+
+
 async def get_object_by_id(
     session: AsyncSession,
     object_id: int,
-    load_relations: bool = True
+    loads: tuple[str, ...] = ()
 ) -> Optional[ConstructionObject]:
-    """Получить объект по ID"""
-    query = select(ConstructionObject).where(ConstructionObject.id == object_id)
+    """
+    Получить объект по ID
+
+    Args:
+        loads: Имена связей для загрузки (см. _OBJECT_LOADS), например ("creator", "files").
+            Если загружена хотя бы одна связь, обращение к остальным выбрасывает
+            ошибку вместо скрытого ленивого запроса.
+    """
+    unknown = set(loads) - _OBJECT_LOADS.keys()
+    if unknown:
+        raise ValueError(f"Неизвестные связи объекта: {', '.join(sorted(unknown))}")
+
+    if not loads:
+        cached = _cache_get(session, ("object", object_id))
+        if cached is not None:
+            return cached
+
+    query = _OBJECT_BY_ID
     
-    if load_relations:
-        query = query.options(
-            selectinload(ConstructionObject.expenses),
-            selectinload(ConstructionObject.advances),
-            selectinload(ConstructionObject.files),
-            selectinload(ConstructionObject.creator)
-        )
+    if loads:
+        options = [_OBJECT_LOADS[name]() for name in loads]
+        query = query.options(*options, raiseload('*', sql_only=True))
     
-    result = await session.execute(query)
-    return result.scalar_one_or_none()
+    result = await session.execute(query, {"object_id": object_id})
+    obj = result.scalar_one_or_none()
+    if not loads:
+        _cache_set(session, ("object", object_id), obj)
+    return obj
 
 
 async def get_objects_by_status(
@@ -206,21 +415,42 @@ async def get_objects_by_status(
     return list(result.scalars().all())
 
 
+async def get_object_summaries_by_status(session: AsyncSession, status: ObjectStatus) -> list:
+    """
+    Получить id и название объектов по статусу для списков и клавиатур
+    
+    Returns:
+        Строки с атрибутами id и name (новые объекты первыми)
+    """
+    result = await session.execute(
+        select(ConstructionObject.id, ConstructionObject.name)
+        .where(ConstructionObject.status == status)
+        .order_by(ConstructionObject.created_at.desc())
+    )
+    return list(result.all())
+
+
 async def update_object_status(
     session: AsyncSession,
     object_id: int,
     status: ObjectStatus
 ) -> Optional[ConstructionObject]:
-    """Обновить статус объекта"""
-    completed_at = datetime.utcnow() if status == ObjectStatus.COMPLETED else None
+    """
+    Обновить статус объекта
+    
+    Всегда одним UPDATE ... RETURNING: время завершения берётся с часов БД,
+    а уже загруженный в сессию объект обновляется из возвращённой строки.
+    """
+    # Колонка хранит UTC без часового пояса
+    completed_at = func.timezone("utc", func.now()) if status == ObjectStatus.COMPLETED else None
     
     result = await session.execute(
         update(ConstructionObject)
         .where(ConstructionObject.id == object_id)
         .values(status=status, completed_at=completed_at)
         .returning(ConstructionObject)
+        .execution_options(populate_existing=True)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
@@ -230,45 +460,81 @@ async def update_object_s3_discount(
     actual_s3_discount: Decimal
 ) -> Optional[ConstructionObject]:
     """Обновить фактическую стоимость С3 со скидкой"""
+    _cache_drop(session, ("object", object_id))
     result = await session.execute(
         update(ConstructionObject)
         .where(ConstructionObject.id == object_id)
         .values(actual_s3_discount=actual_s3_discount)
         .returning(ConstructionObject)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
+def _object_in_period(start_date: datetime, end_date: datetime):
+    """Условие попадания объекта в период (по дате начала или завершения).
+
+    Каждый диапазон проверяется отдельным подзапросом, чтобы Postgres мог
+    использовать индексы по start_date и completed_at вместо полного сканирования.
+    """
+    ids_in_period = union(
+        select(ConstructionObject.id).where(
+            ConstructionObject.start_date.between(start_date, end_date)
+        ),
+        select(ConstructionObject.id).where(
+            ConstructionObject.completed_at.between(start_date, end_date)
+        )
+    )
+    return ConstructionObject.id.in_(ids_in_period)
+
+
 async def get_objects_by_period(
     session: AsyncSession,
     start_date: datetime,
-    end_date: datetime
+    end_date: datetime,
+    load_relations: bool = False
 ) -> List[ConstructionObject]:
-    """Получить объекты за период"""
-    result = await session.execute(
+    """
+    Получить объекты за период
+    
+    По умолчанию связи не загружаются: суммы расходов для отчётов
+    считает get_period_expense_totals одним GROUP BY. С load_relations=True
+    подгружаются только расходы (авансы периодные отчёты не используют).
+    """
+    query = (
         select(ConstructionObject)
-        .where(
-            or_(
-                and_(
-                    ConstructionObject.start_date >= start_date,
-                    ConstructionObject.start_date <= end_date
-                ),
-                and_(
-                    ConstructionObject.completed_at >= start_date,
-                    ConstructionObject.completed_at <= end_date
-                )
-            )
-        )
-        .options(
-            selectinload(ConstructionObject.expenses),
-            selectinload(ConstructionObject.advances)
-        )
+        .where(_object_in_period(start_date, end_date))
         .order_by(ConstructionObject.created_at.desc())
     )
+
+    if load_relations:
+        query = query.options(
+            selectinload(ConstructionObject.expenses),
+            raiseload('*', sql_only=True)
+        )
+
+    result = await session.execute(query)
     return list(result.scalars().all())
 
 
+async def get_period_expense_totals(
+    session: AsyncSession,
+    start_date: datetime,
+    end_date: datetime
+) -> dict[int, dict[ExpenseType, Decimal]]:
+    """Получить суммы расходов по типам для каждого объекта за период одним запросом"""
+    result = await session.execute(
+        select(Expense.object_id, Expense.type, func.sum(Expense.amount))
+        .join(ConstructionObject, ConstructionObject.id == Expense.object_id)
+        .where(_object_in_period(start_date, end_date))
+        .group_by(Expense.object_id, Expense.type)
+    )
+
+    totals: dict[int, dict[ExpenseType, Decimal]] = {}
+    for object_id, expense_type, total in result.all():
+        totals.setdefault(object_id, {})[expense_type] = total
+    return totals
+
+
 # ============ EXPENSE CRUD ============
 
 async def create_expense(
@@ -284,39 +550,177 @@ async def create_expense(
     compensation_status: Optional[CompensationStatus] = None
 ) -> Expense:
     """Создать расход"""
-    expense = Expense(
-        object_id=object_id,
-        type=expense_type,
-        amount=amount,
-        description=description,
-        date=date,
-        photo_url=photo_url,
-        added_by=added_by,
-        payment_source=payment_source,
-        compensation_status=compensation_status
-    )
-    session.add(expense)
-    await session.commit()
-    await session.refresh(expense)
+    result = await session.execute(
+        insert(Expense)
+        .values(
+            object_id=object_id,
+            type=expense_type,
+            amount=amount,
+            description=description,
+            date=date,
+            photo_url=photo_url,
+            added_by=added_by,
+            payment_source=payment_source,
+            compensation_status=compensation_status
+        )
+        .returning(Expense)
+    )
+    expense = result.scalar_one()
     return expense
 
 
-async def get_expenses_by_object(
+async def create_expense_with_log(
     session: AsyncSession,
     object_id: int,
-    expense_type: Optional[ExpenseType] = None
-) -> List[Expense]:
-    """Получить расходы по объекту"""
+    expense_type: ExpenseType,
+    amount: Decimal,
+    description: str,
+    date: datetime,
+    added_by: int,
+    log_description: str,
+    photo_url: Optional[str] = None,
+    payment_source: PaymentSource = PaymentSource.COMPANY,
+    compensation_status: Optional[CompensationStatus] = None
+) -> int:
+    """
+    Создать расход и запись в логе объекта одним запросом
+    
+    Оба INSERT выполняются в одном выражении через data-modifying CTE.
+    
+    Returns:
+        ID созданного расхода
+    """
+    new_expense = (
+        insert(Expense)
+        .values(
+            object_id=object_id,
+            type=expense_type,
+            amount=amount,
+            description=description,
+            date=date,
+            photo_url=photo_url,
+            added_by=added_by,
+            payment_source=payment_source,
+            compensation_status=compensation_status
+        )
+        .returning(Expense.id, Expense.object_id)
+        .cte("new_expense")
+    )
+    new_log = (
+        insert(ObjectLog)
+        .from_select(
+            ["object_id", "user_id", "action", "description"],
+            select(
+                new_expense.c.object_id,
+                literal(added_by, ObjectLog.user_id.type),
+                literal(ObjectLogType.EXPENSE_CREATED, ObjectLog.action.type),
+                literal(log_description, ObjectLog.description.type),
+            )
+        )
+        .cte("new_log")
+    )
+    result = await session.execute(select(new_expense.c.id).add_cte(new_log))
+    return result.scalar_one()
+
+
+async def bulk_create_expenses(session: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Создать несколько расходов одним INSERT
+
+    Args:
+        rows: Словари с полями Expense (object_id, type, amount, description, date, added_by, ...)
+
+    Returns:
+        ID созданных расходов в порядке rows
+    """
+    if not rows:
+        return []
+    result = await session.execute(insert(Expense).returning(Expense.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars().all())
+
+
+def _expenses_by_object_query(object_id: int, expense_type: Optional[ExpenseType] = None):
     query = select(Expense).where(Expense.object_id == object_id)
     
     if expense_type:
         query = query.where(Expense.type == expense_type)
     
-    query = query.order_by(Expense.date.desc())
-    result = await session.execute(query)
+    return query.order_by(Expense.date.desc())
+
+
+async def get_expenses_by_object(
+    session: AsyncSession,
+    object_id: int,
+    expense_type: Optional[ExpenseType] = None
+) -> List[Expense]:
+    """Получить расходы по объекту"""
+    result = await session.execute(_expenses_by_object_query(object_id, expense_type))
     return list(result.scalars().all())
 
 
+_EXPENSE_ROWS_BY_OBJECT_TYPE = (
+    select(
+        Expense.id,
+        Expense.amount,
+        Expense.date,
+        Expense.description,
+        Expense.photo_url,
+        Expense.payment_source,
+        Expense.compensation_status,
+    )
+    .where(
+        Expense.object_id == bindparam("object_id"),
+        Expense.type == bindparam("expense_type"),
+    )
+    .order_by(Expense.date.desc())
+)
+
+
+async def get_expense_rows_by_object(
+    session: AsyncSession,
+    object_id: int,
+    expense_type: ExpenseType
+) -> list:
+    """
+    Получить расходы объекта одного типа строками (без ORM-объектов)
+    
+    Для списков и сумм: поля id, amount, date, description, photo_url,
+    payment_source, compensation_status доступны как атрибуты строки.
+    """
+    result = await session.execute(
+        _EXPENSE_ROWS_BY_OBJECT_TYPE,
+        {"object_id": object_id, "expense_type": expense_type},
+    )
+    return list(result.all())
+
+
+async def iter_expenses_by_object(
+    session: AsyncSession,
+    object_id: int,
+    expense_type: Optional[ExpenseType] = None
+) -> AsyncIterator[Expense]:
+    """
+    Перебрать расходы по объекту через серверный курсор
+    
+    В отличие от get_expenses_by_object не держит в памяти весь список:
+    строки подгружаются порциями по мере обхода.
+    """
+    result = await session.stream_scalars(
+        _expenses_by_object_query(object_id, expense_type).execution_options(yield_per=200)
+    )
+    async for expense in result:
+        yield expense
+
+
+_TOTAL_EXPENSES_BY_TYPE = (
+    select(func.coalesce(func.sum(Expense.amount), 0))
+    .where(and_(
+        Expense.object_id == bindparam("object_id"),
+        Expense.type == bindparam("expense_type")
+    ))
+)
+
+
 async def get_total_expenses_by_type(
     session: AsyncSession,
     object_id: int,
@@ -324,18 +728,55 @@ async def get_total_expenses_by_type(
 ) -> Decimal:
     """Получить сумму расходов определенного типа по объекту"""
     result = await session.execute(
-        select(func.sum(Expense.amount))
-        .where(and_(Expense.object_id == object_id, Expense.type == expense_type))
+        _TOTAL_EXPENSES_BY_TYPE,
+        {"object_id": object_id, "expense_type": expense_type}
     )
-    total = result.scalar()
-    return Decimal(total) if total else Decimal(0)
+    return result.scalar_one()
 
 
-async def get_expense_by_id(session: AsyncSession, expense_id: int) -> Optional[Expense]:
-    """Получить расход по ID"""
+async def get_expense_totals_by_type(
+    session: AsyncSession,
+    object_id: int
+) -> dict[ExpenseType, dict[str, object]]:
+    """
+    Получить сводку расходов объекта по типам одним запросом
+
+    Для каждого типа: общая сумма, количество записей, суммы по источнику
+    оплаты и количество расходов прораба, ожидающих компенсации.
+    """
+    is_personal = Expense.payment_source == PaymentSource.PERSONAL
     result = await session.execute(
-        select(Expense).where(Expense.id == expense_id)
+        select(
+            Expense.type,
+            func.sum(Expense.amount).label("total"),
+            func.count(Expense.id).label("records"),
+            func.coalesce(func.sum(Expense.amount).filter(is_personal), 0).label("personal_total"),
+            func.count(Expense.id).filter(
+                and_(is_personal, Expense.compensation_status == CompensationStatus.PENDING)
+            ).label("personal_pending"),
+            func.coalesce(func.sum(Expense.amount).filter(~is_personal), 0).label("company_total"),
+        )
+        .where(Expense.object_id == object_id)
+        .group_by(Expense.type)
     )
+    return {
+        row.type: {
+            "total": row.total,
+            "count": row.records,
+            "personal_total": row.personal_total,
+            "personal_pending": row.personal_pending,
+            "company_total": row.company_total,
+        }
+        for row in result.all()
+    }
+
+
+_EXPENSE_BY_ID = select(Expense).where(Expense.id == bindparam("expense_id"))
+
+
+async def get_expense_by_id(session: AsyncSession, expense_id: int) -> Optional[Expense]:
+    """Получить расход по ID"""
+    result = await session.execute(_EXPENSE_BY_ID, {"expense_id": expense_id})
     return result.scalar_one_or_none()
 
 
@@ -351,7 +792,6 @@ async def update_compensation_status(
         .values(compensation_status=status)
         .returning(Expense)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
@@ -389,7 +829,6 @@ async def update_expense(
         .values(**fields)
         .returning(Expense)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
@@ -398,7 +837,6 @@ async def delete_expense(session: AsyncSession, expense_id: int) -> bool:
     result = await session.execute(
         delete(Expense).where(Expense.id == expense_id)
     )
-    await session.commit()
     return result.rowcount > 0
 
 
@@ -414,45 +852,114 @@ async def create_advance(
     added_by: int
 ) -> Advance:
     """Создать аванс"""
-    advance = Advance(
-        object_id=object_id,
-        worker_name=worker_name,
-        work_type=work_type,
-        amount=amount,
-        date=date,
-        added_by=added_by
-    )
-    session.add(advance)
-    await session.commit()
-    await session.refresh(advance)
+    result = await session.execute(
+        insert(Advance)
+        .values(
+            object_id=object_id,
+            worker_name=worker_name,
+            work_type=work_type,
+            amount=amount,
+            date=date,
+            added_by=added_by
+        )
+        .returning(Advance)
+    )
+    advance = result.scalar_one()
     return advance
 
 
+_ADVANCE_BY_ID = select(Advance).where(Advance.id == bindparam("advance_id"))
+
+
 async def get_advance_by_id(session: AsyncSession, advance_id: int) -> Optional[Advance]:
     """Получить аванс по ID"""
-    result = await session.execute(
-        select(Advance).where(Advance.id == advance_id)
-    )
+    result = await session.execute(_ADVANCE_BY_ID, {"advance_id": advance_id})
     return result.scalar_one_or_none()
 
 
-async def get_advances_by_object(session: AsyncSession, object_id: int) -> List[Advance]:
-    """Получить авансы по объекту"""
-    result = await session.execute(
+def _advances_by_object_query(object_id: int):
+    return (
         select(Advance)
         .where(Advance.object_id == object_id)
         .order_by(Advance.date.desc())
     )
+
+
+async def get_advances_by_object(session: AsyncSession, object_id: int) -> List[Advance]:
+    """Получить авансы по объекту"""
+    result = await session.execute(_advances_by_object_query(object_id))
     return list(result.scalars().all())
 
 
+_ADVANCE_ROWS_BY_OBJECT = (
+    select(Advance.work_type, Advance.amount, Advance.date)
+    .where(Advance.object_id == bindparam("object_id"))
+)
+
+
+async def get_advance_rows_by_object(session: AsyncSession, object_id: int) -> list:
+    """
+    Получить авансы по объекту строками (work_type, amount, date)
+    
+    Для сводок, которым не нужны ORM-объекты: строки не попадают
+    в identity map и не несут состояния SQLAlchemy.
+    """
+    result = await session.execute(_ADVANCE_ROWS_BY_OBJECT, {"object_id": object_id})
+    return list(result.all())
+
+
+async def iter_advances_by_object(session: AsyncSession, object_id: int) -> AsyncIterator[Advance]:
+    """Перебрать авансы по объекту через серверный курсор"""
+    result = await session.stream_scalars(
+        _advances_by_object_query(object_id).execution_options(yield_per=200)
+    )
+    async for advance in result:
+        yield advance
+
+
+_TOTAL_ADVANCES = (
+    select(func.coalesce(func.sum(Advance.amount), 0))
+    .where(Advance.object_id == bindparam("object_id"))
+)
+
+
 async def get_total_advances(session: AsyncSession, object_id: int) -> Decimal:
     """Получить общую сумму авансов по объекту"""
-    result = await session.execute(
-        select(func.sum(Advance.amount)).where(Advance.object_id == object_id)
-    )
-    total = result.scalar()
-    return Decimal(total) if total else Decimal(0)
+    result = await session.execute(_TOTAL_ADVANCES, {"object_id": object_id})
+    return result.scalar_one()
+
+
+_OBJECT_FINANCIAL_SUMMARY = select(
+    *[
+        select(func.coalesce(func.sum(Expense.amount), 0))
+        .where(and_(
+            Expense.object_id == bindparam("object_id"),
+            Expense.type == expense_type
+        ))
+        .scalar_subquery()
+        .label(expense_type.name)
+        for expense_type in ExpenseType
+    ],
+    select(func.coalesce(func.sum(Advance.amount), 0))
+    .where(Advance.object_id == bindparam("object_id"))
+    .scalar_subquery()
+    .label("advances"),
+)
+
+
+async def get_object_financial_summary(session: AsyncSession, object_id: int) -> dict:
+    """
+    Получить суммы расходов по типам и сумму авансов объекта одним запросом
+    
+    Returns:
+        {"expenses": {ExpenseType: Decimal}, "advances": Decimal}
+    """
+    result = await session.execute(_OBJECT_FINANCIAL_SUMMARY, {"object_id": object_id})
+    row = result.one()._mapping
+    return {
+        "expenses": {expense_type: row[expense_type.name] for expense_type in ExpenseType},
+        "advances": row["advances"],
+    }
 
 
 async def update_advance(
@@ -470,7 +977,6 @@ async def update_advance(
         .values(**fields)
         .returning(Advance)
     )
-    await session.commit()
     return result.scalar_one_or_none()
 
 
@@ -479,7 +985,6 @@ async def delete_advance(session: AsyncSession, advance_id: int) -> bool:
     result = await session.execute(
         delete(Advance).where(Advance.id == advance_id)
     )
-    await session.commit()
     return result.rowcount > 0
 
 
@@ -494,84 +999,193 @@ async def create_object_log(
     user_id: Optional[int] = None
 ) -> ObjectLog:
     """Создать запись лога объекта"""
-    log = ObjectLog(
-        object_id=object_id,
-        user_id=user_id,
-        action=action,
-        description=description
-    )
-    session.add(log)
-    await session.commit()
-    await session.refresh(log)
+    result = await session.execute(
+        insert(ObjectLog)
+        .values(
+            object_id=object_id,
+            user_id=user_id,
+            action=action,
+            description=description
+        )
+        .returning(ObjectLog)
+    )
+    log = result.scalar_one()
     return log
 
 
+async def bulk_create_object_logs(session: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Создать несколько записей лога объекта одним INSERT
+
+    Args:
+        rows: Словари с полями ObjectLog (object_id, action, description, user_id)
+
+    Returns:
+        ID созданных записей в порядке rows
+    """
+    if not rows:
+        return []
+    result = await session.execute(insert(ObjectLog).returning(ObjectLog.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars().all())
+
+
 async def get_object_logs(
     session: AsyncSession,
     object_id: int,
-    page: int,
-    page_size: int
+    page_size: int,
+    cursor: Optional[tuple[datetime, int]] = None,
+    backward: bool = False
 ) -> tuple[list[ObjectLog], int]:
-    """Получить логи по объекту с пагинацией"""
-    total_result = await session.execute(
-        select(func.count(ObjectLog.id)).where(ObjectLog.object_id == object_id)
+    """
+    Получить страницу логов объекта (keyset-пагинация по created_at, id)
+
+    Args:
+        cursor: Ключ (created_at, id) последней записи предыдущей страницы;
+            при backward=True — ключ первой записи следующей страницы
+        backward: Листать к более новым записям
+
+    Returns:
+        Записи от новых к старым и общее количество логов объекта
+    """
+    total_query = (
+        select(func.count(ObjectLog.id))
+        .where(ObjectLog.object_id == object_id)
+        .correlate(None)
+        .scalar_subquery()
     )
-    total = total_result.scalar() or 0
-
-    if total == 0:
-        return [], 0
-
-    page = max(page, 1)
-    offset = (page - 1) * page_size
-
-    result = await session.execute(
-        select(ObjectLog)
+    query = (
+        select(ObjectLog, total_query.label("total"))
         .where(ObjectLog.object_id == object_id)
-        .order_by(ObjectLog.created_at.desc())
-        .offset(offset)
         .limit(page_size)
         .options(selectinload(ObjectLog.user))
     )
 
-    logs = list(result.scalars().all())
-    return logs, total
+    # Сравнение по ключу строки использует индекс (object_id, created_at, id)
+    # и не перебирает предыдущие страницы, в отличие от OFFSET
+    position = tuple_(ObjectLog.created_at, ObjectLog.id)
+    if backward:
+        if cursor is not None:
+            query = query.where(position > tuple_(*cursor))
+        query = query.order_by(ObjectLog.created_at.asc(), ObjectLog.id.asc())
+    else:
+        if cursor is not None:
+            query = query.where(position < tuple_(*cursor))
+        query = query.order_by(ObjectLog.created_at.desc(), ObjectLog.id.desc())
+
+    result = await session.execute(query)
+    rows = result.all()
+
+    if not rows:
+        if cursor is None:
+            return [], 0
+        total_result = await session.execute(select(total_query))
+        return [], total_result.scalar() or 0
+
+    logs = [row[0] for row in rows]
+    if backward:
+        logs.reverse()
+    return logs, rows[0].total
 
 
 # ============ FILE CRUD ============
 
 async def create_file(session: AsyncSession, file_data: dict) -> File:
     """Создать запись о файле"""
-    file = File(**file_data)
-    session.add(file)
-    await session.commit()
-    await session.refresh(file)
+    result = await session.execute(
+        insert(File).values(**file_data).returning(File)
+    )
+    file = result.scalar_one()
     return file
 
 
-async def get_file_by_id(session: AsyncSession, file_id: int) -> Optional[File]:
-    """Получить файл по ID"""
-    result = await session.execute(
-        select(File).where(File.id == file_id)
-    )
+FILE_WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+async def create_file_from_stream(
+    session: AsyncSession,
+    file_data: dict,
+    stream: BinaryIO,
+    chunk_size: int = FILE_WRITE_CHUNK_SIZE
+) -> File:
+    """
+    Создать запись о файле, записывая содержимое из потока частями
+
+    Первая часть вставляется вместе со строкой, остальные дописываются
+    в bytea через ``file_data || :chunk``, поэтому в памяти одновременно
+    находится не больше одной части файла.
+    """
+    file = await create_file(session, {**file_data, "file_data": stream.read(chunk_size)})
+    while chunk := stream.read(chunk_size):
+        await session.execute(
+            update(File)
+            .where(File.id == file.id)
+            .values(file_data=File.file_data.op("||")(chunk))
+            .execution_options(synchronize_session=False)
+        )
+    session.expire(file, ["file_data"])
+    return file
+
+
+_FILE_BY_ID = select(File).where(File.id == bindparam("file_id"))
+_FILE_WITH_BLOB_BY_ID = _FILE_BY_ID.options(undefer_group("blob"))
+
+
+async def get_file_by_id(
+    session: AsyncSession,
+    file_id: int,
+    include_blob: bool = True,
+) -> Optional[File]:
+    """
+    Получить файл по ID
+
+    С include_blob=False загружаются только метаданные — достаточно,
+    чтобы проверить принадлежность файла объекту или отправить его по
+    telegram_file_id.
+    """
+    query = _FILE_WITH_BLOB_BY_ID if include_blob else _FILE_BY_ID
+    result = await session.execute(query, {"file_id": file_id})
     return result.scalar_one_or_none()
 
 
 async def get_files_by_object(
     session: AsyncSession,
     object_id: int,
-    file_type: Optional[FileType] = None
+    file_type: Optional[FileType] = None,
+    include_blob: bool = False,
 ) -> List[File]:
-    """Получить файлы по объекту"""
+    """
+    Получить файлы по объекту
+
+    По умолчанию бинарные данные (file_data) не загружаются — для списков
+    достаточно метаданных. Для отправки файла используйте get_file_by_id
+    или передайте include_blob=True.
+    """
     query = select(File).where(File.object_id == object_id)
-    
+
     if file_type:
         query = query.where(File.file_type == file_type)
-    
+
+    if include_blob:
+        query = query.options(undefer_group("blob"))
+
     query = query.order_by(File.uploaded_at.desc())
     result = await session.execute(query)
     return list(result.scalars().all())
 
 
+async def count_files_by_object_and_type(
+    session: AsyncSession,
+    object_id: int
+) -> dict[FileType, int]:
+    """Получить количество файлов объекта по типам одним запросом"""
+    result = await session.execute(
+        select(File.file_type, func.count(File.id))
+        .where(File.object_id == object_id)
+        .group_by(File.file_type)
+    )
+    return {file_type: count for file_type, count in result.all()}
+
+
 # ============ COMPANY EXPENSES CRUD ============
 
 
@@ -583,16 +1197,18 @@ async def create_company_expense(
     description: Optional[str],
     added_by: Optional[int],
 ) -> CompanyExpense:
-    expense = CompanyExpense(
-        category=category.strip(),
-        amount=amount,
-        date=date,
-        description=description.strip() if description else None,
-        added_by=added_by,
-    )
-    session.add(expense)
-    await session.commit()
-    await session.refresh(expense)
+    result = await session.execute(
+        insert(CompanyExpense)
+        .values(
+            category=category.strip(),
+            amount=amount,
+            date=date,
+            description=description.strip() if description else None,
+            added_by=added_by,
+        )
+        .returning(CompanyExpense)
+    )
+    expense = result.scalar_one()
     return expense
 
 
@@ -608,42 +1224,47 @@ async def create_company_recurring_expense(
     end_month: Optional[int] = None,
     end_year: Optional[int] = None,
 ) -> CompanyRecurringExpense:
-    await _ensure_company_recurring_schema(session)
-
-    expense = CompanyRecurringExpense(
-        category=category.strip(),
-        amount=amount,
-        day_of_month=max(1, min(day_of_month, 31)),
-        start_month=start_month,
-        start_year=start_year,
-        end_month=end_month,
-        end_year=end_year,
-        description=description.strip() if description else None,
-        added_by=added_by,
-    )
-    session.add(expense)
-    await session.commit()
-    await session.refresh(expense)
+    result = await session.execute(
+        insert(CompanyRecurringExpense)
+        .values(
+            category=category.strip(),
+            amount=amount,
+            day_of_month=max(1, min(day_of_month, 31)),
+            start_month=start_month,
+            start_year=start_year,
+            end_month=end_month,
+            end_year=end_year,
+            description=description.strip() if description else None,
+            added_by=added_by,
+        )
+        .returning(CompanyRecurringExpense)
+    )
+    expense = result.scalar_one()
     return expense
 
 
+_COMPANY_EXPENSE_BY_ID = (
+    select(CompanyExpense)
+    .where(CompanyExpense.id == bindparam("expense_id"))
+    .options(selectinload(CompanyExpense.user))
+)
+
+_COMPANY_RECURRING_BY_ID = (
+    select(CompanyRecurringExpense)
+    .where(CompanyRecurringExpense.id == bindparam("expense_id"))
+    .options(selectinload(CompanyRecurringExpense.user))
+)
+
+
 async def get_company_expense_by_id(session: AsyncSession, expense_id: int) -> Optional[CompanyExpense]:
     """Получить разовый расход по ID"""
-    result = await session.execute(
-        select(CompanyExpense)
-        .where(CompanyExpense.id == expense_id)
-        .options(selectinload(CompanyExpense.user))
-    )
+    result = await session.execute(_COMPANY_EXPENSE_BY_ID, {"expense_id": expense_id})
     return result.scalar_one_or_none()
 
 
 async def get_company_recurring_expense_by_id(session: AsyncSession, expense_id: int) -> Optional[CompanyRecurringExpense]:
     """Получить постоянный расход по ID"""
-    result = await session.execute(
-        select(CompanyRecurringExpense)
-        .where(CompanyRecurringExpense.id == expense_id)
-        .options(selectinload(CompanyRecurringExpense.user))
-    )
+    result = await session.execute(_COMPANY_RECURRING_BY_ID, {"expense_id": expense_id})
     return result.scalar_one_or_none()
 
 
@@ -651,7 +1272,6 @@ async def delete_company_expense(session: AsyncSession, expense_id: int) -> bool
     result = await session.execute(
         delete(CompanyExpense).where(CompanyExpense.id == expense_id)
     )
-    await session.commit()
     return result.rowcount > 0
 
 
@@ -659,7 +1279,6 @@ async def delete_company_recurring_expense(session: AsyncSession, expense_id: in
     result = await session.execute(
         delete(CompanyRecurringExpense).where(CompanyRecurringExpense.id == expense_id)
     )
-    await session.commit()
     return result.rowcount > 0
 
 
@@ -672,166 +1291,99 @@ async def get_company_expense_categories(session: AsyncSession) -> List[tuple[st
         ).group_by(CompanyExpense.category)
         .order_by(func.sum(CompanyExpense.amount).desc())
     )
-    return [(row[0], Decimal(row[1]), row[2]) for row in result.all()]
-
-
-async def get_company_expenses_by_category(session: AsyncSession, category: str) -> List[CompanyExpense]:
-    result = await session.execute(
-        select(CompanyExpense)
-        .where(CompanyExpense.category == category)
-        .order_by(CompanyExpense.date.desc())
-        .options(selectinload(CompanyExpense.user))
-    )
-    return list(result.scalars().all())
-
-
-async def _ensure_company_recurring_schema(session: AsyncSession) -> None:
-    schema_query = text("SELECT current_schema()")
-
-    try:
-        schema_result = await session.execute(schema_query)
-        current_schema = schema_result.scalar() or "public"
-
-        columns_result = await session.execute(
-            text(
-                """
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_schema = :schema AND table_name = :table
-                """
-            ),
-            {"schema": current_schema, "table": "company_recurring_expenses"},
-        )
-        columns = {row[0] for row in columns_result.all()}
-    except Exception as exc:  # noqa: BLE001
-        logger.warning("Failed to inspect company_recurring_expenses: %s", exc)
-        return
-
-    if not columns:
-        return
+    return [(category, total, count) for category, total, count in result.all()]
 
-    statements: list[str] = []
 
-    if "period_month" in columns and "start_month" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses RENAME COLUMN period_month TO start_month")
-        columns.discard("period_month")
-        columns.add("start_month")
+def _company_expenses_query(category: Optional[str] = None):
+    query = select(CompanyExpense).order_by(CompanyExpense.date.desc(), CompanyExpense.id.desc())
+    if category is not None:
+        query = query.where(CompanyExpense.category == category)
+    return query.options(selectinload(CompanyExpense.user))
 
-    if "period_year" in columns and "start_year" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses RENAME COLUMN period_year TO start_year")
-        columns.discard("period_year")
-        columns.add("start_year")
 
-    if "day_of_month" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses ADD COLUMN day_of_month INTEGER NOT NULL DEFAULT 1")
-        statements.append("ALTER TABLE company_recurring_expenses ALTER COLUMN day_of_month DROP DEFAULT")
-        columns.add("day_of_month")
-
-    if "end_month" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses ADD COLUMN end_month INTEGER NULL")
-        columns.add("end_month")
-
-    if "end_year" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses ADD COLUMN end_year INTEGER NULL")
-        columns.add("end_year")
+async def get_company_expenses_by_category(
+    session: AsyncSession,
+    category: str,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[CompanyExpense]:
+    query = _company_expenses_query(category).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await session.execute(query)
+    return list(result.scalars().all())
 
-    if "is_active" not in columns:
-        statements.append("ALTER TABLE company_recurring_expenses ADD COLUMN is_active BOOLEAN NOT NULL DEFAULT TRUE")
-        statements.append("UPDATE company_recurring_expenses SET is_active = TRUE WHERE is_active IS NULL")
-        statements.append("ALTER TABLE company_recurring_expenses ALTER COLUMN is_active DROP DEFAULT")
-        columns.add("is_active")
 
-    if statements:
-        for stmt in statements:
-            await session.execute(text(stmt))
-        await session.commit()
+async def iter_company_expenses_by_category(
+    session: AsyncSession,
+    category: Optional[str] = None
+) -> AsyncIterator[CompanyExpense]:
+    """
+    Перебрать разовые расходы (новые первыми) через серверный курсор
+    
+    Args:
+        category: Категория; None — расходы всех категорий
+    """
+    result = await session.stream_scalars(
+        _company_expenses_query(category).execution_options(yield_per=200)
+    )
+    async for expense in result:
+        yield expense
 
 
 async def get_company_recurring_categories(session: AsyncSession) -> List[tuple[str, Decimal, int]]:
-    await _ensure_company_recurring_schema(session)
-
-    query = (
+    result = await session.execute(
         select(
             CompanyRecurringExpense.category,
             func.sum(CompanyRecurringExpense.amount),
             func.count(CompanyRecurringExpense.id),
         )
+        .where(CompanyRecurringExpense.is_active == True)  # noqa: E712
         .group_by(CompanyRecurringExpense.category)
         .order_by(func.sum(CompanyRecurringExpense.amount).desc())
     )
-
-    try:
-        query = query.where(CompanyRecurringExpense.is_active == True)  # noqa: E712
-        result = await session.execute(query)
-    except ProgrammingError as exc:  # column might not exist in legacy DB
-        logger.warning("is_active column missing, falling back without filter: %s", exc)
-        await session.rollback()
-        result = await session.execute(
-            select(
-                CompanyRecurringExpense.category,
-                func.sum(CompanyRecurringExpense.amount),
-                func.count(CompanyRecurringExpense.id),
-            )
-            .group_by(CompanyRecurringExpense.category)
-            .order_by(func.sum(CompanyRecurringExpense.amount).desc())
-        )
-
-    return [(row[0], Decimal(row[1]), row[2]) for row in result.all()]
+    return [(category, total, count) for category, total, count in result.all()]
 
 
 async def get_company_recurring_by_category(session: AsyncSession, category: str) -> List[CompanyRecurringExpense]:
-    await _ensure_company_recurring_schema(session)
-
-    query = (
+    result = await session.execute(
         select(CompanyRecurringExpense)
-        .where(CompanyRecurringExpense.category == category)
-        .options(selectinload(CompanyRecurringExpense.user))
-    )
-
-    try:
-        query = query.where(CompanyRecurringExpense.is_active == True)  # noqa: E712
-        query = query.order_by(
+        .where(
+            CompanyRecurringExpense.category == category,
+            CompanyRecurringExpense.is_active == True,  # noqa: E712
+        )
+        .order_by(
             CompanyRecurringExpense.start_year.desc(),
             CompanyRecurringExpense.start_month.desc(),
             CompanyRecurringExpense.day_of_month.asc(),
         )
-        result = await session.execute(query)
-        return list(result.scalars().all())
-    except ProgrammingError as exc:
-        logger.warning("Legacy recurring expense schema detected: %s", exc)
-        await session.rollback()
-
-    raw_result = await session.execute(
-        text(
-            """
-            SELECT id, category, amount, description, period_month, period_year, created_at, added_by
-            FROM company_recurring_expenses
-            WHERE category = :category
-            ORDER BY period_year DESC, period_month DESC
-            """
+        .options(selectinload(CompanyRecurringExpense.user))
+    )
+    return list(result.scalars().all())
+
+
+def _recurring_started_by(year: int, month: int):
+    """Шаблон начал действовать не позже указанного месяца (условие по индексу start_year, start_month)"""
+    return or_(
+        CompanyRecurringExpense.start_year < year,
+        and_(
+            CompanyRecurringExpense.start_year == year,
+            CompanyRecurringExpense.start_month <= month,
         ),
-        {"category": category},
-    )
-
-    items = []
-    for row in raw_result.mappings():
-        dummy = CompanyRecurringExpense(
-            id=row["id"],
-            category=row["category"],
-            amount=row["amount"],
-            description=row["description"],
-            start_month=row["period_month"],
-            start_year=row["period_year"],
-            day_of_month=1,
-            end_month=None,
-            end_year=None,
-            is_active=True,
-            added_by=row["added_by"],
-        )
-        dummy.created_at = row["created_at"]
-        items.append(dummy)
+    )
 
-    return items
+
+def _recurring_not_ended_before(year: int, month: int):
+    """Шаблон не закончился раньше указанного месяца"""
+    return or_(
+        CompanyRecurringExpense.end_year.is_(None),
+        CompanyRecurringExpense.end_month.is_(None),
+        CompanyRecurringExpense.end_year > year,
+        and_(
+            CompanyRecurringExpense.end_year == year,
+            CompanyRecurringExpense.end_month >= month,
+        ),
+    )
 
 
 async def get_company_expenses_for_period(
@@ -839,110 +1391,69 @@ async def get_company_expenses_for_period(
     start_date: datetime,
     end_date: datetime,
 ) -> dict:
-    one_time_query = await session.execute(
-        select(func.coalesce(func.sum(CompanyExpense.amount), 0)).where(
-            and_(CompanyExpense.date >= start_date, CompanyExpense.date <= end_date)
-        )
+    one_time_total_query = (
+        select(func.coalesce(func.sum(CompanyExpense.amount), 0))
+        .where(and_(CompanyExpense.date >= start_date, CompanyExpense.date <= end_date))
+        .scalar_subquery()
     )
-    one_time_total = Decimal(one_time_query.scalar() or 0)
-
-    await _ensure_company_recurring_schema(session)
-
-    try:
-        recurring_result = await session.execute(
-            select(CompanyRecurringExpense).where(CompanyRecurringExpense.is_active == True)  # noqa: E712
-        )
-        templates = recurring_result.scalars().all()
-    except ProgrammingError as exc:
-        logger.warning("Legacy recurring expense schema detected during totals: %s", exc)
-        await session.rollback()
-        recurring_result = await session.execute(
-            text(
-                """
-                SELECT id, amount, period_month, period_year
-                FROM company_recurring_expenses
-                """
-            )
-        )
-
-        recurring_total = Decimal(0)
-        for row in recurring_result.fetchall():
-            period_month = row["period_month"]
-            period_year = row["period_year"]
-            template_start = period_year * 12 + period_month
-            period_start = start_date.year * 12 + start_date.month
-            period_end = end_date.year * 12 + end_date.month
-            first_month = max(template_start, period_start)
-            last_month = period_end
-            if first_month > last_month:
-                continue
-            months_count = last_month - first_month + 1
-            recurring_total += Decimal(row["amount"]) * months_count
-
-        return {
-            "one_time": one_time_total,
-            "recurring": recurring_total,
-            "total": one_time_total + recurring_total,
-        }
 
     period_start = start_date.year * 12 + start_date.month
     period_end = end_date.year * 12 + end_date.month
 
-    recurring_total = Decimal(0)
-
-    for template in templates:
-        template_start = template.start_year * 12 + template.start_month
-        template_end = (
-            template.end_year * 12 + template.end_month
-            if template.end_year and template.end_month
-            else None
+    # Количество месяцев действия шаблона внутри периода считается в SQL,
+    # чтобы не загружать все шаблоны ради одной суммы
+    template_start = CompanyRecurringExpense.start_year * 12 + CompanyRecurringExpense.start_month
+    template_end = func.coalesce(
+        CompanyRecurringExpense.end_year * 12 + CompanyRecurringExpense.end_month,
+        period_end,
+    )
+    months_count = func.greatest(
+        0,
+        func.least(template_end, period_end) - func.greatest(template_start, period_start) + 1,
+    )
+    recurring_total_query = (
+        select(func.coalesce(func.sum(CompanyRecurringExpense.amount * months_count), 0))
+        .where(
+            CompanyRecurringExpense.is_active == True,  # noqa: E712
+            _recurring_started_by(end_date.year, end_date.month),
+            _recurring_not_ended_before(start_date.year, start_date.month),
         )
+        .scalar_subquery()
+    )
 
-        first_month = max(template_start, period_start)
-        last_month = min(template_end, period_end) if template_end else period_end
-
-        if first_month > last_month:
-            continue
-
-        months_count = last_month - first_month + 1
-        recurring_total += template.amount * months_count
+    totals_result = await session.execute(
+        select(
+            one_time_total_query.label("one_time"),
+            recurring_total_query.label("recurring"),
+        )
+    )
+    one_time, recurring = totals_result.one()
 
     return {
-        "one_time": one_time_total,
-        "recurring": recurring_total,
-        "total": one_time_total + recurring_total,
+        "one_time": one_time,
+        "recurring": recurring,
+        "total": one_time + recurring,
     }
 
 
-async def get_financial_years(session: AsyncSession) -> List[int]:
-    years: set[int] = set()
+def _year_of(column):
+    return cast(func.extract("year", column), Integer)
 
-    object_years = await session.execute(
-        select(func.extract("year", ConstructionObject.start_date)).where(ConstructionObject.start_date.isnot(None))
-    )
-    years.update(int(value) for value, in object_years if value is not None)
 
-    object_end_years = await session.execute(
-        select(func.extract("year", ConstructionObject.end_date)).where(ConstructionObject.end_date.isnot(None))
-    )
-    years.update(int(value) for value, in object_end_years if value is not None)
-
-    company_expense_years = await session.execute(
-        select(func.extract("year", CompanyExpense.date)).where(CompanyExpense.date.isnot(None))
-    )
-    years.update(int(value) for value, in company_expense_years if value is not None)
+# Все годы, в которых есть объекты или расходы фирмы, одним запросом
+_FINANCIAL_YEARS = union(
+    select(_year_of(ConstructionObject.start_date)).where(ConstructionObject.start_date.isnot(None)),
+    select(_year_of(ConstructionObject.end_date)).where(ConstructionObject.end_date.isnot(None)),
+    select(_year_of(CompanyExpense.date)).where(CompanyExpense.date.isnot(None)),
+    select(CompanyRecurringExpense.start_year).where(CompanyRecurringExpense.start_year.isnot(None)),
+    select(CompanyRecurringExpense.end_year).where(CompanyRecurringExpense.end_year.isnot(None)),
+)
 
-    recurring_years = await session.execute(
-        select(CompanyRecurringExpense.start_year, CompanyRecurringExpense.end_year)
-    )
-    for start_year, end_year in recurring_years:
-        if start_year:
-            years.add(int(start_year))
-        if end_year:
-            years.add(int(end_year))
 
-    current_year = datetime.utcnow().year
-    years.add(current_year)
+async def get_financial_years(session: AsyncSession) -> List[int]:
+    result = await session.execute(_FINANCIAL_YEARS)
+    years = {int(year) for year in result.scalars() if year}
+    years.add(datetime.utcnow().year)
 
     return sorted(years)
 
@@ -955,16 +1466,18 @@ async def create_company_expense_log(
     description: str,
     user_id: Optional[int] = None,
 ) -> CompanyExpenseLog:
-    log = CompanyExpenseLog(
-        expense_type=expense_type,
-        entity_id=entity_id,
-        action=action,
-        description=description,
-        user_id=user_id,
-    )
-    session.add(log)
-    await session.commit()
-    await session.refresh(log)
+    result = await session.execute(
+        insert(CompanyExpenseLog)
+        .values(
+            expense_type=expense_type,
+            entity_id=entity_id,
+            action=action,
+            description=description,
+            user_id=user_id,
+        )
+        .returning(CompanyExpenseLog)
+    )
+    log = result.scalar_one()
     return log
 
 
@@ -993,14 +1506,12 @@ async def get_company_expense_logs(
 
 
 async def delete_object(session: AsyncSession, object_id: int) -> bool:
+    _cache_drop(session, ("object", object_id))
+    # Расходы, авансы, файлы и логи удаляет сама БД (ON DELETE CASCADE, миграция 011)
     result = await session.execute(
-        select(ConstructionObject).where(ConstructionObject.id == object_id)
+        delete(ConstructionObject)
+        .where(ConstructionObject.id == object_id)
+        .returning(ConstructionObject.id)
     )
-    obj = result.scalar_one_or_none()
-    if not obj:
-        return False
-
-    await session.delete(obj)
-    await session.commit()
-    return True
+    return result.scalar_one_or_none() is not None
 
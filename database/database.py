@@ -1,6 +1,10 @@
 """
 Подключение к базе данных и создание сессий
 """
+import asyncio
+from typing import AsyncIterator
+from uuid import uuid4
+
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.pool import NullPool
@@ -8,82 +12,186 @@ from bot.config import config
 from database.models import Base
 
 
-# Преобразуем DATABASE_URL для async работы
-database_url = config.DATABASE_URL
-if database_url.startswith("postgresql://"):
-    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-elif database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+def _prepared_statement_name() -> str:
+    """Уникальное имя prepared statement (см. _engine_options)"""
+    return f"__asyncpg_{uuid4()}__"
+
+
+def _engine_options(use_pgbouncer: bool) -> dict:
+    """
+    Параметры пула и драйвера для create_async_engine
+    
+    Пул держит тёплые соединения между апдейтами, чтобы не платить за
+    TCP/TLS/auth на каждый запрос. За PgBouncer в transaction mode пулом
+    занимается он, поэтому на стороне приложения пул отключается.
+    
+    Кэш подготовленных выражений asyncpg живёт в рамках соединения:
+    повторяющиеся запросы (get_user_by_telegram_id, get_expense_by_id, ...)
+    не разбираются и не планируются сервером заново. PgBouncer раздаёт
+    серверные соединения разным клиентам, и именованные prepared statements
+    конфликтуют ("already exists"): там кэш выключен, а диалект SQLAlchemy
+    получает уникальные имена выражений.
+    """
+    if use_pgbouncer:
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _prepared_statement_name,
+                "server_settings": {"jit": "off"},
+            },
+        }
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "connect_args": {
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 1024,
+        },
+    }
+
 
 # Создаем async engine
 engine = create_async_engine(
-    database_url,
+    config.ASYNC_DATABASE_URL,
     echo=False,  # Установить True для debug SQL запросов
-    poolclass=NullPool,  # Для Railway и других платформ с ограничениями на подключения
+    logging_name="app",
+    # Параметры запросов (суммы, описания, telegram_id) не попадают
+    # в тексты исключений и логи
+    hide_parameters=True,
+    **_engine_options(config.USE_PGBOUNCER),
+    # Кэш скомпилированного SQL (структура запросов, не результаты);
+    # запас под все выражения из database/crud.py и их варианты
+    query_cache_size=1200,
 )
 
+# Сколько соединений приложение держит одновременно: столько же, сколько
+# отдаёт пул (pool_size + max_overflow). Сессия получает соединение при
+# первом запросе и держит его до commit/rollback/close — в том числе пока
+# обработчик ждёт OpenAI, разбор PDF или скачивание файла. Поэтому слот
+# занимается на всё это время, а не на один запрос. С обычным пулом лишние
+# сессии ждут слот в очереди, а не падают по pool_timeout; за PgBouncer
+# (NullPool) слот — единственное, что ограничивает число подключений.
+DB_MAX_CONNECTIONS = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+_db_slots = asyncio.Semaphore(DB_MAX_CONNECTIONS)
+
+
+class LimitedAsyncSession(AsyncSession):
+    """
+    AsyncSession, которая занимает слот _db_slots на время владения соединением
+    
+    Слот берётся перед первым обращением к БД и возвращается после
+    commit/rollback/close, когда соединение уходит обратно в пул.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_db_slot = False
+    
+    async def _acquire_db_slot(self) -> None:
+        if not self._holds_db_slot:
+            await _db_slots.acquire()
+            self._holds_db_slot = True
+    
+    def _release_db_slot(self) -> None:
+        if self._holds_db_slot:
+            self._holds_db_slot = False
+            _db_slots.release()
+    
+    async def execute(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().execute(*args, **kwargs)
+    
+    async def scalar(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().scalar(*args, **kwargs)
+    
+    async def scalars(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().scalars(*args, **kwargs)
+    
+    async def get(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().get(*args, **kwargs)
+    
+    async def stream(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().stream(*args, **kwargs)
+    
+    async def stream_scalars(self, *args, **kwargs):
+        await self._acquire_db_slot()
+        return await super().stream_scalars(*args, **kwargs)
+    
+    async def commit(self):
+        try:
+            await super().commit()
+        finally:
+            self._release_db_slot()
+    
+    async def rollback(self):
+        try:
+            await super().rollback()
+        finally:
+            self._release_db_slot()
+    
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._release_db_slot()
+
+
 # Создаем фабрику сессий
 async_session_maker = async_sessionmaker(
     engine,
-    class_=AsyncSession,
+    class_=LimitedAsyncSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
 
-async def get_session() -> AsyncSession:
+def get_session() -> AsyncSession:
     """
     Получить сессию базы данных
     
+    AsyncSession сама является асинхронным контекстным менеджером,
+    поэтому дополнительная обёртка не нужна.
+    
     Использование:
         async with get_session() as session:
             # работа с БД
     """
+    return async_session_maker()
+
+
+async def session_dep() -> AsyncIterator[AsyncSession]:
+    """Сессия в виде async-генератора — для DI, ожидающего генератор-зависимость"""
     async with async_session_maker() as session:
         yield session
 
 
 async def init_db():
     """Инициализация базы данных - создание всех таблиц"""
+    # Fallback: СНАЧАЛА добавляем enum значения если их нет (до create_all).
+    # ALTER TYPE ... ADD VALUE нельзя выполнять внутри блока транзакции на
+    # старых версиях PostgreSQL, поэтому — отдельное соединение в AUTOCOMMIT.
+    # На пустой базе типа ещё нет: его создаст create_all ниже.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for value in ("estimate", "payroll"):
+            try:
+                await conn.execute(sa.text(f"ALTER TYPE filetype ADD VALUE IF NOT EXISTS '{value}'"))
+            except Exception as e:
+                print(f"⚠️ Не удалось обновить filetype enum (возможно тип ещё не создан): {e}")
+                break
+    
+    # ПОТОМ создаём таблицы
     async with engine.begin() as conn:
-        # Fallback: СНАЧАЛА добавляем enum значения если их нет (до create_all)
-        try:
-            await conn.execute(sa.text("""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1 FROM pg_type t 
-                        JOIN pg_enum e ON e.enumtypid = t.oid
-                        WHERE t.typname = 'filetype' AND e.enumlabel = 'estimate'
-                    ) THEN
-                        ALTER TYPE filetype ADD VALUE IF NOT EXISTS 'estimate';
-                    END IF;
-                EXCEPTION WHEN duplicate_object THEN
-                    NULL;
-                END;
-                $$;
-            """))
-            
-            await conn.execute(sa.text("""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1 FROM pg_type t 
-                        JOIN pg_enum e ON e.enumtypid = t.oid
-                        WHERE t.typname = 'filetype' AND e.enumlabel = 'payroll'
-                    ) THEN
-                        ALTER TYPE filetype ADD VALUE IF NOT EXISTS 'payroll';
-                    END IF;
-                EXCEPTION WHEN duplicate_object THEN
-                    NULL;
-                END;
-                $$;
-            """))
-        except Exception as e:
-            print(f"⚠️ Не удалось обновить filetype enum (возможно уже существует): {e}")
-        
-        # ПОТОМ создаём таблицы
         await conn.run_sync(Base.metadata.create_all)
     print("✅ База данных инициализирована")
 
@@ -6,12 +6,22 @@ from decimal import Decimal
 from typing import Optional
 from sqlalchemy import (
     Integer, String, BigInteger, Boolean, DateTime,
-    Numeric, Text, Enum, ForeignKey, UniqueConstraint, LargeBinary
+    Numeric, Text, Enum, ForeignKey, UniqueConstraint, LargeBinary, Index, text
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 import enum
 
 
+# Время вставки проставляет сервер (naive UTC, как и остальные колонки DateTime):
+# INSERT не передаёт created_at/uploaded_at, значение приходит через RETURNING
+UTC_NOW = text("timezone('utc', now())")
+
+
+def _enum_values(enum_cls) -> list[str]:
+    """В PostgreSQL enum хранятся значения (admin, active, ...), а не имена членов"""
+    return [member.value for member in enum_cls]
+
+
 class Base(DeclarativeBase):
     """Базовый класс для всех моделей"""
     pass
@@ -78,9 +88,9 @@ class User(Base):
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
     username: Mapped[Optional[str]] = mapped_column(String(255))
     full_name: Mapped[Optional[str]] = mapped_column(String(255))
-    role: Mapped[UserRole] = mapped_column(Enum(UserRole, values_callable=lambda x: [e.value for e in x]), nullable=False, default=UserRole.FOREMAN)
+    role: Mapped[UserRole] = mapped_column(Enum(UserRole, values_callable=_enum_values, name="userrole"), nullable=False, default=UserRole.FOREMAN)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
     
     # Relationships
     created_objects: Mapped[list["ConstructionObject"]] = relationship(
@@ -101,10 +111,10 @@ class ConstructionObject(Base):
     name: Mapped[str] = mapped_column(String(500), nullable=False)
     address: Mapped[Optional[str]] = mapped_column(Text)
     foreman_name: Mapped[Optional[str]] = mapped_column(String(255))
-    start_date: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    start_date: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
     end_date: Mapped[Optional[datetime]] = mapped_column(DateTime)
     status: Mapped[ObjectStatus] = mapped_column(
-        Enum(ObjectStatus), default=ObjectStatus.ACTIVE, nullable=False, index=True
+        Enum(ObjectStatus, values_callable=_enum_values, name="objectstatus"), default=ObjectStatus.ACTIVE, nullable=False, index=True
     )
     
     # Финансы
@@ -123,15 +133,16 @@ class ConstructionObject(Base):
     
     # Метаданные
     created_by: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
-    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
     
     # Relationships
     creator: Mapped["User"] = relationship("User", back_populates="created_objects", foreign_keys=[created_by])
-    expenses: Mapped[list["Expense"]] = relationship("Expense", back_populates="construction_object", cascade="all, delete-orphan")
-    advances: Mapped[list["Advance"]] = relationship("Advance", back_populates="construction_object", cascade="all, delete-orphan")
-    files: Mapped[list["File"]] = relationship("File", back_populates="construction_object", cascade="all, delete-orphan")
-    logs: Mapped[list["ObjectLog"]] = relationship("ObjectLog", back_populates="construction_object", cascade="all, delete-orphan")
+    # Дочерние строки удаляет PostgreSQL (ON DELETE CASCADE): ORM не подгружает их перед удалением объекта
+    expenses: Mapped[list["Expense"]] = relationship("Expense", back_populates="construction_object", cascade="all, delete-orphan", passive_deletes=True)
+    advances: Mapped[list["Advance"]] = relationship("Advance", back_populates="construction_object", cascade="all, delete-orphan", passive_deletes=True)
+    files: Mapped[list["File"]] = relationship("File", back_populates="construction_object", cascade="all, delete-orphan", passive_deletes=True)
+    logs: Mapped[list["ObjectLog"]] = relationship("ObjectLog", back_populates="construction_object", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<ConstructionObject(id={self.id}, name='{self.name}', status={self.status})>"
@@ -140,25 +151,35 @@ class ConstructionObject(Base):
 class Expense(Base):
     """Расходы (расходники, транспорт, накладные)"""
     __tablename__ = "expenses"
+    __table_args__ = (
+        Index("ix_expenses_object_type_date", "object_id", "type", text('"date" DESC')),
+        Index("ix_expenses_object_date", "object_id", text('"date" DESC')),
+        # Частичный индекс: в него попадают только расходы прораба, ожидающие компенсации
+        Index(
+            "ix_expenses_pending_compensation_partial",
+            "object_id", text('"date" DESC'),
+            postgresql_where=text("payment_source = 'personal' AND compensation_status = 'pending'"),
+        ),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id"), nullable=False, index=True)
-    type: Mapped[ExpenseType] = mapped_column(Enum(ExpenseType, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id", ondelete="CASCADE"), nullable=False, index=True)
+    type: Mapped[ExpenseType] = mapped_column(Enum(ExpenseType, values_callable=_enum_values, name="expensetype"), nullable=False)
     amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
     date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     photo_url: Mapped[Optional[str]] = mapped_column(String(500))
     added_by: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
     
     # Новые поля для отслеживания оплаты
     payment_source: Mapped[PaymentSource] = mapped_column(
-        Enum(PaymentSource, values_callable=lambda x: [e.value for e in x]), 
+        Enum(PaymentSource, values_callable=_enum_values, name="paymentsource"), 
         default=PaymentSource.COMPANY, 
         nullable=False
     )
     compensation_status: Mapped[Optional[CompensationStatus]] = mapped_column(
-        Enum(CompensationStatus, values_callable=lambda x: [e.value for e in x]),
+        Enum(CompensationStatus, values_callable=_enum_values, name="compensationstatus"),
         nullable=True  # NULL если payment_source = COMPANY
     )
     
@@ -173,15 +194,18 @@ class Expense(Base):
 class Advance(Base):
     """Авансы рабочим"""
     __tablename__ = "advances"
+    __table_args__ = (
+        Index("ix_advances_object_date", "object_id", text('"date" DESC')),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id"), nullable=False, index=True)
+    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id", ondelete="CASCADE"), nullable=False, index=True)
     worker_name: Mapped[str] = mapped_column(String(255), nullable=False)
     work_type: Mapped[str] = mapped_column(String(500), nullable=False)
     amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
     date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     added_by: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
     
     # Relationships
     construction_object: Mapped["ConstructionObject"] = relationship("ConstructionObject", back_populates="advances")
@@ -196,14 +220,18 @@ class File(Base):
     __tablename__ = "files"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id"), nullable=False, index=True)
-    file_type: Mapped[FileType] = mapped_column(Enum(FileType, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id", ondelete="CASCADE"), nullable=False, index=True)
+    file_type: Mapped[FileType] = mapped_column(Enum(FileType, values_callable=_enum_values, name="filetype"), nullable=False)
     telegram_file_id: Mapped[str] = mapped_column(String(255), nullable=False)  # ID файла в Telegram
-    file_data: Mapped[Optional[bytes]] = mapped_column(LargeBinary)  # Бинарные данные файла
+    # Бинарные данные файла. Отложенная загрузка: обычный SELECT по files
+    # тянет только метаданные, байты читаются явным undefer_group("blob")
+    file_data: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary, deferred=True, deferred_group="blob", deferred_raiseload=True
+    )
     filename: Mapped[Optional[str]] = mapped_column(String(500))
     mime_type: Mapped[Optional[str]] = mapped_column(String(100))
     file_size: Mapped[Optional[int]] = mapped_column(Integer)  # Размер в байтах
-    uploaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    uploaded_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
     
     # Relationships
     construction_object: Mapped["ConstructionObject"] = relationship("ConstructionObject", back_populates="files")
@@ -216,6 +244,9 @@ class CompanyExpense(Base):
     """Разовые расходы компании"""
 
     __tablename__ = "company_expenses"
+    __table_args__ = (
+        Index("ix_company_expenses_category_date", "category", text('"date" DESC'), text("id DESC")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     category: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
@@ -223,9 +254,9 @@ class CompanyExpense(Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
     date: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
     added_by: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
 
-    user: Mapped[Optional["User"]] = relationship("User")
+    user: Mapped[Optional["User"]] = relationship("User", lazy="selectin")  # Автор выводится в каждой карточке/ленте
 
     def __repr__(self):
         return f"<CompanyExpense(id={self.id}, category='{self.category}', amount={self.amount})>"
@@ -235,6 +266,9 @@ class CompanyRecurringExpense(Base):
     """Шаблоны ежемесячных расходов компании"""
 
     __tablename__ = "company_recurring_expenses"
+    __table_args__ = (
+        Index("ix_company_recurring_expenses_start_period", "start_year", "start_month"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     category: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
@@ -246,10 +280,10 @@ class CompanyRecurringExpense(Base):
     end_year: Mapped[Optional[int]] = mapped_column(Integer)
     description: Mapped[Optional[str]] = mapped_column(Text)
     added_by: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
-    user: Mapped[Optional["User"]] = relationship("User")
+    user: Mapped[Optional["User"]] = relationship("User", lazy="selectin")  # Автор выводится в каждой карточке/ленте
 
     def __repr__(self):
         return (
@@ -262,6 +296,12 @@ class CompanyExpenseLog(Base):
     """Логи действий по расходам компании"""
 
     __tablename__ = "company_expense_logs"
+    __table_args__ = (
+        Index(
+            "ix_company_expense_logs_type_entity_created",
+            "expense_type", "entity_id", text("created_at DESC"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     expense_type: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -269,9 +309,9 @@ class CompanyExpenseLog(Base):
     action: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False, index=True)
 
-    user: Mapped[Optional["User"]] = relationship("User")
+    user: Mapped[Optional["User"]] = relationship("User", lazy="selectin")  # Автор выводится в каждой карточке/ленте
 
     def __repr__(self):
         return f"<CompanyExpenseLog(id={self.id}, type={self.expense_type}, action={self.action})>"
@@ -295,16 +335,19 @@ class ObjectLog(Base):
     """Логи действий по объекту"""
 
     __tablename__ = "object_logs"
+    __table_args__ = (
+        Index("ix_object_logs_object_created", "object_id", text("created_at DESC"), text("id DESC")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id"), nullable=False, index=True)
+    object_id: Mapped[int] = mapped_column(Integer, ForeignKey("objects.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
-    action: Mapped[ObjectLogType] = mapped_column(Enum(ObjectLogType, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    action: Mapped[ObjectLogType] = mapped_column(Enum(ObjectLogType, values_callable=_enum_values, name="objectlogtype"), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=UTC_NOW, nullable=False, index=True)
 
     construction_object: Mapped["ConstructionObject"] = relationship("ConstructionObject", back_populates="logs")
-    user: Mapped[Optional["User"]] = relationship("User")
+    user: Mapped[Optional["User"]] = relationship("User", lazy="selectin")  # Автор выводится в каждой карточке/ленте
 
     def __repr__(self):
         return f"<ObjectLog(id={self.id}, object_id={self.object_id}, action={self.action})>"
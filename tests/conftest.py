@@ -0,0 +1,10 @@
+"""
+Общая настройка тестов
+
+Переменные окружения задаются до импорта тестовых модулей: bot.config
+читает их при импорте, а клиент OpenAI создаётся при импорте обработчиков.
+"""
+import os
+
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
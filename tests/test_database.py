@@ -0,0 +1,55 @@
+"""
+Тесты настроек подключения к базе данных
+"""
+import unittest
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from database.database import _engine_options
+
+
+class EngineOptionsPgBouncerTest(unittest.TestCase):
+    """Режим USE_PGBOUNCER: без пула и без именованного кэша выражений"""
+
+    def setUp(self):
+        self.options = _engine_options(use_pgbouncer=True)
+        self.connect_args = self.options["connect_args"]
+
+    def test_pool_disabled(self):
+        self.assertIs(self.options["poolclass"], NullPool)
+        self.assertNotIn("pool_size", self.options)
+
+        engine = create_async_engine("postgresql+asyncpg://localhost/test", **self.options)
+        try:
+            self.assertIsInstance(engine.pool, NullPool)
+        finally:
+            engine.sync_engine.dispose()
+
+    def test_statement_caches_disabled(self):
+        self.assertEqual(self.connect_args["statement_cache_size"], 0)
+        self.assertEqual(self.connect_args["prepared_statement_cache_size"], 0)
+
+    def test_prepared_statement_names_are_unique(self):
+        name_func = self.connect_args["prepared_statement_name_func"]
+        names = {name_func() for _ in range(100)}
+
+        self.assertEqual(len(names), 100)
+        for name in names:
+            self.assertTrue(name.startswith("__asyncpg_") and name.endswith("__"))
+
+
+class EngineOptionsPooledTest(unittest.TestCase):
+    """Прямое подключение: пул и кэш подготовленных выражений"""
+
+    def test_pool_and_caches_enabled(self):
+        options = _engine_options(use_pgbouncer=False)
+
+        self.assertNotIn("poolclass", options)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertGreater(options["connect_args"]["statement_cache_size"], 0)
+        self.assertNotIn("prepared_statement_name_func", options["connect_args"])
+
+
+if __name__ == "__main__":
+    unittest.main()
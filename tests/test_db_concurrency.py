@@ -0,0 +1,126 @@
+"""
+Тесты ограничения одновременных обращений к БД
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import bot.main
+import database.database
+from database.database import LimitedAsyncSession, engine
+
+
+class _FakeSession:
+    """Сессия без подключения: DatabaseMiddleware нужны только info/commit/rollback"""
+
+    def __init__(self):
+        self.info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class DatabaseMiddlewareSlotsTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_slow_handler_does_not_block_other_update(self):
+        """Middleware сам слот не берёт: обработчик без запросов к БД никого не блокирует"""
+        slow_started = asyncio.Event()
+        release_slow = asyncio.Event()
+
+        async def slow_handler(event, data):
+            slow_started.set()
+            await release_slow.wait()  # например, распознавание голоса до первого запроса
+            return "slow"
+
+        async def fast_handler(event, data):
+            return "fast"
+
+        middleware = bot.main.DatabaseMiddleware()
+        with mock.patch.object(database.database, "_db_slots", asyncio.Semaphore(1)), \
+                mock.patch.object(bot.main, "async_session_maker", _FakeSession):
+            slow = asyncio.create_task(middleware(slow_handler, object(), {}))
+            await slow_started.wait()
+
+            fast = await asyncio.wait_for(middleware(fast_handler, object(), {}), timeout=1)
+            self.assertEqual(fast, "fast")
+            self.assertFalse(slow.done())
+
+            release_slow.set()
+            self.assertEqual(await slow, "slow")
+
+
+async def _fake_execute(self, *args, **kwargs):
+    return None
+
+
+async def _fake_commit(self):
+    return None
+
+
+class LimitedAsyncSessionTest(unittest.IsolatedAsyncioTestCase):
+    """Слот занят, пока сессия владеет соединением"""
+
+    def setUp(self):
+        self.slots = asyncio.Semaphore(1)
+        patches = [
+            mock.patch.object(database.database, "_db_slots", self.slots),
+            mock.patch.object(AsyncSession, "execute", _fake_execute),
+            mock.patch.object(AsyncSession, "commit", _fake_commit),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_limit_follows_pool_config(self):
+        self.assertEqual(
+            database.database.DB_MAX_CONNECTIONS,
+            database.database.config.DB_POOL_SIZE + database.database.config.DB_MAX_OVERFLOW,
+        )
+
+    async def test_idle_session_holds_no_slot(self):
+        """Открытая сессия без запросов не занимает слот"""
+        async with LimitedAsyncSession(engine):
+            self.assertFalse(self.slots.locked())
+
+    async def test_slot_held_until_commit(self):
+        """Слот не освобождается между запросами: соединение всё ещё занято"""
+        first = LimitedAsyncSession(engine)
+        second = LimitedAsyncSession(engine)
+
+        await first.execute("SELECT 1")
+        await first.execute("SELECT 2")  # повторный запрос не берёт второй слот
+        self.assertTrue(self.slots.locked())
+
+        waiting = asyncio.create_task(second.execute("SELECT 1"))
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+
+        await first.commit()
+        await asyncio.wait_for(waiting, timeout=1)
+        self.assertTrue(self.slots.locked())
+
+        await second.close()
+        self.assertFalse(self.slots.locked())
+
+    async def test_close_releases_slot_after_error(self):
+        """Слот возвращается при выходе из контекста, даже если обработчик упал"""
+        with self.assertRaises(RuntimeError):
+            async with LimitedAsyncSession(engine) as session:
+                await session.execute("SELECT 1")
+                raise RuntimeError("handler failed")
+        self.assertFalse(self.slots.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
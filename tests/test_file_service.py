@@ -0,0 +1,67 @@
+"""
+Тесты сохранения файлов из Telegram в БД
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+import bot.services.file_service as file_service
+from database.crud import FILE_WRITE_CHUNK_SIZE
+from database.models import FileType
+
+
+class _RecordingSession:
+    """Сессия без подключения: запоминает выполненные запросы"""
+
+    def __init__(self):
+        self.statements = []
+        self.expired = []
+
+    async def execute(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        return SimpleNamespace(scalar_one=lambda: SimpleNamespace(id=1))
+
+    def expire(self, instance, attribute_names=None):
+        self.expired.append((instance, attribute_names))
+
+
+def _bind_values(statement) -> dict:
+    return statement.compile(dialect=postgresql.dialect()).params
+
+
+class SaveDocumentTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_document_written_in_chunks(self):
+        """Содержимое пишется в bytea частями, размер берётся из буфера"""
+        # больше DOWNLOAD_SPOOL_SIZE: буфер сбрасывается на диск
+        content = b"x" * FILE_WRITE_CHUNK_SIZE + b"y" * FILE_WRITE_CHUNK_SIZE + b"z" * 3
+
+        async def download_file(file_path, destination, seek=True):
+            destination.write(content)
+
+        tg_bot = mock.Mock()
+        tg_bot.get_file = mock.AsyncMock(return_value=SimpleNamespace(file_path="documents/a.pdf"))
+        tg_bot.download_file = download_file
+        document = SimpleNamespace(file_id="doc", file_name="a.pdf", mime_type="application/pdf")
+        session = _RecordingSession()
+
+        service = file_service.FileService(tg_bot)
+        db_file = await service.save_document(session, document, object_id=7, file_type=FileType.ESTIMATE)
+
+        self.assertEqual(db_file.id, 1)
+        insert_stmt, *updates = session.statements
+        inserted = _bind_values(insert_stmt)
+        self.assertEqual(inserted["file_data"], b"x" * FILE_WRITE_CHUNK_SIZE)
+        self.assertEqual(inserted["file_size"], len(content))
+        self.assertEqual(
+            [_bind_values(stmt)["file_data_1"] for stmt in updates],
+            [b"y" * FILE_WRITE_CHUNK_SIZE, b"zzz"],
+        )
+        self.assertIn("files.file_data ||", str(updates[0].compile(dialect=postgresql.dialect())))
+        self.assertEqual(session.expired, [(db_file, ["file_data"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Тесты локального разбора сметы (без обращения к LLM)
+"""
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from bot.services import pdf_parser
+from bot.services.pdf_parser import _regex_extract, parse_pdf_to_object_data
+
+
+SAMPLE_ESTIMATE = """СМЕТА № 14
+Объект: Лестница, КП «Лесное»
+Адрес объекта: Московская обл., Истра, ул. Садовая, 5
+Прораб: Иванов Пётр
+Сроки выполнения: с 01.11.2025 по 30.11.2025
+
+Работы
+1 Монтаж ступеней 12 шт 48 000,00
+2 Шлифовка 1 компл 12 000,00
+Итого по работам: 60 000,00 руб.
+
+Материалы
+3 Облицовочный элемент ступень 12 шт 84 000,00 руб.
+4 Облицовочный элемент плита 2 шт 9 500,50 ₽
+5 Покрытие финишное C3 «Тритон» 3 л 4 200,00
+6 Смесь затирочная эпоксидная С3 "Зубр" 2 кг 1 800,00
+7 Клей плиточный 10 меш 3 500,00
+Итого по расходным материалам: 3 500,00
+
+Накладные расходы: 2 000
+Транспортные расходы: 1 500,00
+
+Предоплата: 80 000 руб.
+Окончательная оплата: 82 000,50 руб.
+"""
+
+
+class RegexExtractTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _regex_extract(SAMPLE_ESTIMATE)
+
+    def test_text_fields(self):
+        self.assertEqual(self.data["name"], "Лестница, КП «Лесное»")
+        self.assertEqual(self.data["address"], "Московская обл., Истра, ул. Садовая, 5")
+        self.assertEqual(self.data["foreman_name"], "Иванов Пётр")
+
+    def test_period(self):
+        self.assertEqual(self.data["start_date"], "01.11.2025")
+        self.assertEqual(self.data["end_date"], "30.11.2025")
+
+    def test_labeled_dates(self):
+        data = _regex_extract("Дата начала работ: 03.02.2025\nДата окончания: 28.02.2025")
+        self.assertEqual(data["start_date"], "03.02.2025")
+        self.assertEqual(data["end_date"], "28.02.2025")
+
+    def test_payments(self):
+        self.assertEqual(self.data["prepayment"], Decimal("80000"))
+        self.assertEqual(self.data["final_payment"], Decimal("82000.50"))
+
+    def test_section_totals(self):
+        self.assertEqual(self.data["estimate_works"], Decimal("60000.00"))
+        self.assertEqual(self.data["estimate_supplies"], Decimal("3500.00"))
+        self.assertEqual(self.data["estimate_overhead"], Decimal("2000"))
+        self.assertEqual(self.data["estimate_transport"], Decimal("1500.00"))
+
+    def test_c3_lines_summed(self):
+        self.assertEqual(self.data["estimate_s3"], Decimal("99500.50"))
+        self.assertEqual(len(self.data["c3_items"]), 4)
+        self.assertFalse(any("Клей" in line for line in self.data["c3_items"]))
+
+    def test_general_materials_total_not_taken_as_supplies(self):
+        """Общий итог по материалам включает С3 и не считается расходниками"""
+        data = _regex_extract("Итого по материалам: 103 000,50")
+        self.assertIsNone(data["estimate_supplies"])
+
+    def test_missing_fields_are_none(self):
+        data = _regex_extract("Произвольный текст без шаблона")
+        self.assertTrue(all(value is None for value in data.values()))
+
+
+class ParsePdfShortCircuitTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_standard_template_skips_llm(self):
+        with mock.patch.object(pdf_parser, "_openai_client") as client:
+            data = await parse_pdf_to_object_data(SAMPLE_ESTIMATE)
+
+        client.chat.completions.create.assert_not_called()
+        self.assertEqual(data["estimate_works"], Decimal("60000.00"))
+        self.assertNotIn("actual_s3_discount", data)
+
+
+if __name__ == "__main__":
+    unittest.main()